@@ -0,0 +1,95 @@
+import os
+import time
+import threading
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+# =====================================================
+# PERFILADO DE ASIGNACIONES (opcional)
+# =====================================================
+# Desactivado por defecto: tracemalloc ralentiza todo el proceso. Lo activa el
+# administrador con CHURN_PROFILE_ALLOC=1 (o enable() desde un script), nunca una
+# sesión de la interfaz. Cada bloque `track(label)` acumula llamadas, asignaciones
+# nuevas, bytes netos, pico de memoria y tiempo. tracemalloc es global al proceso:
+# con el perfilado activo los bloques se serializan para que el pico y las
+# instantáneas de uno no incluyan las asignaciones de otro hilo, pero las cifras
+# agregan todas las sesiones.
+
+_enabled = os.environ.get("CHURN_PROFILE_ALLOC", "") == "1"
+_lock = threading.Lock()
+# Reentrante: un bloque puede anidar otro en el mismo hilo
+_track_lock = threading.RLock()
+_stats = OrderedDict()
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = flag
+    if not flag and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _enabled
+
+
+@contextmanager
+def track(label):
+    if not _enabled:
+        yield
+        return
+    with _track_lock:
+        yield from _tracked(label)
+
+
+def _tracked(label):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    current_before, _ = tracemalloc.get_traced_memory()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        current_after, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        diff = after.compare_to(before, "lineno")
+        allocations = sum(d.count_diff for d in diff if d.count_diff > 0)
+        allocated = sum(d.size_diff for d in diff if d.size_diff > 0)
+        with _lock:
+            s = _stats.setdefault(label, {
+                "label": label, "calls": 0, "allocations": 0, "allocated_mb": 0.0,
+                "net_mb": 0.0, "peak_mb": 0.0, "seconds": 0.0,
+            })
+            s["calls"] += 1
+            s["allocations"] += allocations
+            s["allocated_mb"] += allocated / 2**20
+            s["net_mb"] += (current_after - current_before) / 2**20
+            s["peak_mb"] = max(s["peak_mb"], (peak - current_before) / 2**20)
+            s["seconds"] += seconds
+
+
+def stats():
+    """Una fila por etiqueta, con medias por llamada."""
+    with _lock:
+        rows = []
+        for s in _stats.values():
+            calls = max(s["calls"], 1)
+            rows.append({
+                "label": s["label"],
+                "calls": s["calls"],
+                "allocations_per_call": round(s["allocations"] / calls, 1),
+                "allocated_mb_per_call": round(s["allocated_mb"] / calls, 3),
+                "peak_mb": round(s["peak_mb"], 3),
+                "ms_per_call": round(s["seconds"] / calls * 1000, 2),
+            })
+        return rows
+
+
+def reset():
+    with _lock:
+        _stats.clear()
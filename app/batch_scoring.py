@@ -0,0 +1,250 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from app.scoring import score, compiled_preparer, POSITIVE_LABEL
+from app.prediction_cache import score_cached
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - streamlit ya depende de pyarrow
+    pq = None
+
+
+# =====================================================
+# SCORING POR LOTES (archivo → archivo, en un hilo)
+# =====================================================
+# El archivo se lee por bloques de filas, cada bloque se puntúa con el bundle y
+# se añade al CSV de salida antes de leer el siguiente. En memoria solo vive un
+# bloque de entradas y sus predicciones, así que el tamaño del archivo no está
+# limitado por la RAM. El trabajo corre en un hilo: la página solo consulta su
+# progreso en cada rerun.
+
+JOBS_DIR = os.environ.get(
+    "CHURN_BATCH_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".cache", "batch")),
+)
+DEFAULT_CHUNK_ROWS = 50_000
+ID_COLUMNS = ("customerID",)
+MAX_JOBS = 20
+# Archivos de JOBS_DIR sin trabajo asociado (p.ej. de un proceso anterior) se borran pasado este tiempo
+MAX_FILE_AGE_S = float(os.environ.get("CHURN_BATCH_MAX_AGE_H", 24)) * 3600
+
+
+def _count_csv_rows(path, block_size=1 << 20):
+    # Estimación rápida del total para la barra de progreso (líneas − cabecera)
+    lines = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            lines += block.count(b"\n")
+    return max(lines - 1, 0)
+
+
+def _is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def count_rows(path):
+    if _is_parquet(path):
+        if pq is None:
+            raise ImportError("Reading Parquet files requires pyarrow.")
+        return pq.ParquetFile(path).metadata.num_rows
+    return _count_csv_rows(path)
+
+
+def iter_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, categorical=()):
+    """Bloques de `chunk_rows` filas de un CSV o Parquet; las categóricas se leen como texto."""
+    if _is_parquet(path):
+        if pq is None:
+            raise ImportError("Reading Parquet files requires pyarrow.")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            chunk = batch.to_pandas()
+            for col in categorical:
+                if col in chunk.columns and not pd.api.types.is_object_dtype(chunk[col]):
+                    chunk[col] = chunk[col].astype(str).where(chunk[col].notna())
+            yield chunk
+        return
+    dtypes = {col: str for col in categorical}
+    yield from pd.read_csv(path, chunksize=chunk_rows, dtype=dtypes)
+
+
+def _categorical_inputs(bundle):
+    compiled = compiled_preparer(bundle)
+    if compiled is not None:
+        return [col for col, _, _ in compiled.cat_lookup]
+    schema = bundle["pipeline"].steps[0][1].input_schema() if hasattr(bundle["pipeline"], "steps") else {}
+    return [c for c, s in schema.items() if s.get("kind") == "categorical"]
+
+
+class BatchJob:
+    def __init__(self, bundle, bundle_name, source_path, chunk_rows=DEFAULT_CHUNK_ROWS, keep_inputs=False,
+                 use_cache=True, owns_source=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.bundle = bundle
+        self.bundle_name = bundle_name
+        self.source_path = source_path
+        self.chunk_rows = int(chunk_rows)
+        self.keep_inputs = keep_inputs
+        self.use_cache = use_cache
+        self.owns_source = owns_source
+        self.output_path = os.path.join(JOBS_DIR, f"scored_{self.id}.csv")
+        self.status = "queued"
+        self.error = None
+        self.rows_done = 0
+        self.rows_total = None
+        self.positives = 0
+        self.cache_hits = 0
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"batch-{self.id}", daemon=True)
+
+    # --- Estado para la interfaz
+    @property
+    def running(self):
+        return self.status in ("queued", "running")
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def progress(self):
+        if not self.rows_total:
+            return 1.0 if self.status == "done" else 0.0
+        return min(self.rows_done / self.rows_total, 1.0)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        self.status = "running"
+        self.started_at = time.time()
+        tmp_path = self.output_path + ".part"
+        try:
+            self.rows_total = count_rows(self.source_path)
+            target = self.bundle.get("target_name", "Churn")
+            features = [c for c in self.bundle.get("raw_features", []) if c != target]
+            categorical = _categorical_inputs(self.bundle)
+            with open(tmp_path, "w", newline="", encoding="utf-8") as out:
+                for i, chunk in enumerate(iter_chunks(self.source_path, self.chunk_rows, categorical)):
+                    if self._cancel.is_set():
+                        self.status = "cancelled"
+                        break
+                    missing = [c for c in features if c not in chunk.columns]
+                    if missing:
+                        raise ValueError(f"Missing columns in the input file: {', '.join(missing)}")
+                    entrada = chunk[features] if features else chunk
+                    if self.use_cache:
+                        # Clientes repetidos entre archivos (o dentro del mismo) no se vuelven a puntuar
+                        contadores = {}
+                        result = score_cached(self.bundle, entrada, stats=contadores)
+                        self.cache_hits += contadores.get("hits", 0)
+                    else:
+                        result = score(self.bundle, entrada)
+                    if self.keep_inputs:
+                        scored = chunk
+                    else:
+                        ids = [c for c in ID_COLUMNS if c in chunk.columns]
+                        # Sin columna de identificador: el número de fila del archivo permite unir resultados
+                        scored = chunk[ids] if ids else pd.DataFrame(
+                            {"row": range(self.rows_done, self.rows_done + len(chunk))}, index=chunk.index
+                        )
+                    scored = scored.assign(
+                        churn_proba=result.proba, churn_label=result.labels, threshold=result.threshold
+                    )
+                    # Se escribe y se libera el bloque antes de leer el siguiente
+                    scored.to_csv(out, header=(i == 0), index=False)
+                    self.rows_done += len(chunk)
+                    self.positives += int((result.labels == POSITIVE_LABEL).sum())
+            if self.status == "running":
+                os.replace(tmp_path, self.output_path)
+                self.status = "done"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if self.owns_source:
+                _remove(self.source_path)
+
+    def remove_files(self):
+        # Al olvidar el trabajo: su salida deja de ser accesible desde la interfaz
+        _remove(self.output_path)
+        if self.owns_source:
+            _remove(self.source_path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _expire_files(active):
+    """Borra entradas y salidas antiguas de JOBS_DIR que no pertenecen a ningún trabajo activo."""
+    limite = time.time() - MAX_FILE_AGE_S
+    for nombre in os.listdir(JOBS_DIR):
+        path = os.path.join(JOBS_DIR, nombre)
+        if path in active or not nombre.startswith(("input_", "scored_")):
+            continue
+        try:
+            if os.path.getmtime(path) < limite:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+def stage_upload(uploaded_file):
+    """Copia un archivo subido a JOBS_DIR por bloques, para que el hilo lea desde disco."""
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    ext = os.path.splitext(uploaded_file.name)[1].lower() or ".csv"
+    path = os.path.join(JOBS_DIR, f"input_{uuid.uuid4().hex[:12]}{ext}")
+    uploaded_file.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(uploaded_file, f, length=1 << 20)
+    return path
+
+
+def start_job(bundle, bundle_name, source_path, chunk_rows=DEFAULT_CHUNK_ROWS, keep_inputs=False, use_cache=True,
+              owns_source=False):
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    job = BatchJob(bundle, bundle_name, source_path, chunk_rows, keep_inputs, use_cache, owns_source)
+    with _lock:
+        _jobs[job.id] = job
+        # Solo se olvidan trabajos terminados, y con ellos sus archivos
+        while len(_jobs) > MAX_JOBS:
+            viejo = next((k for k, j in _jobs.items() if not j.running), None)
+            if viejo is None:
+                break
+            _jobs.pop(viejo).remove_files()
+        activos = {p for j in _jobs.values() for p in (j.source_path, j.output_path, j.output_path + ".part")}
+    _expire_files(activos)
+    return job.start()
+
+
+def get_job(job_id):
+    with _lock:
+        return _jobs.get(job_id)
@@ -1,24 +1,11 @@
 # app/business_impact.py
-import os
-import joblib
 import pandas as pd
 import numpy as np
 import streamlit as st
 import plotly.express as px
-
-
-def _models_dir():
-    return os.path.join(os.path.dirname(__file__), "..", "models")
-
-def list_bundles():
-    md = _models_dir()
-    return sorted([f for f in os.listdir(md) if f.endswith(".pkl") and not f.startswith("model_metrics")])
-
-def load_bundle(model_name: str, version: str):
-    path = os.path.join(_models_dir(), f"{model_name.lower()}_{version.lower()}.pkl")
-    if not os.path.exists(path):
-        return None
-    return joblib.load(path)
+from app.model_registry import list_bundles, load_bundle
+from app.model_metadata import load_metadata, importances_frame
+from app.prediction_cache import score_cached
 
 
 def business_impact_page(df_clean: pd.DataFrame):
@@ -45,7 +32,6 @@ def business_impact_page(df_clean: pd.DataFrame):
         st.error("Model bundle not found.")
         return
 
-    pipe = bundle["pipeline"]
     target = bundle.get("target_name", "Churn")
     if target not in df_clean.columns:
         st.info("No ground-truth `Churn` column found; only predictions will be shown.")
@@ -83,11 +69,8 @@ def business_impact_page(df_clean: pd.DataFrame):
     # ===============================
     with st.spinner("Scoring current dataset…"):
         X = df_clean.drop(columns=[target]) if target in df_clean.columns else df_clean.copy()
-        if hasattr(pipe, "predict_proba"):
-            proba = pipe.predict_proba(X)[:, 1]
-        else:
-            scores = pipe.decision_function(X)
-            proba = (scores - scores.min()) / (scores.max() - scores.min() + 1e-9)
+        # Cada rerun reutiliza las probabilidades ya calculadas para estos clientes
+        proba = score_cached(bundle, X).proba
         df_scores = df_clean.copy()
         df_scores["churn_proba"] = proba
 
@@ -144,23 +127,9 @@ def business_impact_page(df_clean: pd.DataFrame):
     # Feature importance (drivers)
     # ===============================
     st.subheader("⭐ Key drivers (feature importance)")
-    importances = bundle.get("feature_importances", [])
-    selected = bundle.get("selected_features", None)
-    if importances and (selected or not selected):
-        if selected:
-            feat_names = selected
-        else:
-            try:
-                pre = bundle["pipeline"].named_steps["preprocessing"]
-                feat_names = list(pre._columns) if hasattr(pre, "_columns") else [f"F{i}" for i, _ in enumerate(importances)]
-            except Exception:
-                feat_names = [f"F{i}" for i, _ in enumerate(importances)]
-
-        imp_df = (
-            pd.DataFrame({"feature": feat_names, "importance": importances})
-            .sort_values("importance", ascending=False)
-            .head(20)
-        )
+    meta = load_metadata(mdl, version)
+    imp_df = importances_frame(meta, top=20) if meta is not None else None
+    if imp_df is not None:
         st.plotly_chart(px.bar(imp_df, x="importance", y="feature", orientation="h"), use_container_width=True)
     else:
         st.info("This model doesn't expose feature importances.")
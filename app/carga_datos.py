@@ -1,30 +1,21 @@
 import streamlit as st
 import pandas as pd
 from app.utils import apply_style
+from app import ingest_cache
+from app.inferencia_tipos import inferir_tipos, columnas_con_accion
+from app.ingesta_streaming import leer_csv_por_bloques, PresupuestoExcedido
+from app.compactacion import compactar_dataframe
+from app.perfil_columnas import perfil_de, CAPACIDAD_TOP, TOP_K
+
+UMBRAL_STREAMING_MB = 100
 
 def convertir_columnas_numericas(df):
-    columnas_convertidas = []
-    for col in df.select_dtypes(include=["object"]).columns:
-        try:
-            original = df[col].copy()
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-            nan_ratio = df[col].isna().mean()
-            if nan_ratio > 0.4:
-                df[col] = original
-            else:
-                columnas_convertidas.append(col)
-        except Exception:
-            pass
-    return df, columnas_convertidas
+    df, reporte = inferir_tipos(df, binarias=False)
+    return df, columnas_con_accion(reporte, "to numeric")
 
 def convertir_binarias_a_categoricas(df):
-    columnas_convertidas = []
-    for col in df.select_dtypes(include=["number"]).columns:
-        valores = df[col].dropna().unique()
-        if set(valores).issubset({0, 1}) and len(valores) <= 2:
-            df[col] = df[col].map({0: "No", 1: "Yes"}).astype("object")
-            columnas_convertidas.append(col)
-    return df, columnas_convertidas
+    df, reporte = inferir_tipos(df, numericas=False)
+    return df, columnas_con_accion(reporte, "binary to categorical")
 
 # =====================================================
 # CARGA DE ARCHIVOS
@@ -40,28 +31,92 @@ def cargar_archivo():
     )
     st.markdown("</div>", unsafe_allow_html=True)
 
+    with st.expander("⚙️ Ingestion options"):
+        modo = st.radio(
+            "Ingestion mode:", ["Auto", "Standard", "Streaming"], horizontal=True,
+            help=f"Auto streams CSV files larger than {UMBRAL_STREAMING_MB} MB in chunks with compact dtypes."
+        )
+        presupuesto_mb = st.number_input("Peak memory budget (MB)", min_value=64, value=1024, step=64)
+        compactar = st.checkbox(
+            "Compact dtypes (category / downcast numerics)", value=True,
+            help="Stores low-cardinality text columns as categories and shrinks numeric types."
+        )
+
     if archivo is not None:
         st.success(f"✅ **File uploaded successfully:** `{archivo.name}`")
 
-        try:
-            with st.spinner("⏳ Reading and cleaning data..."):
-                if archivo.name.endswith(".csv"):
-                    df = pd.read_csv(archivo)
-                else:
-                    df = pd.read_excel(archivo)
+        es_csv = archivo.name.endswith(".csv")
+        streaming = es_csv and (
+            modo == "Streaming"
+            or (modo == "Auto" and archivo.size > UMBRAL_STREAMING_MB * 1024 * 1024)
+        )
 
-                df, cols_num = convertir_columnas_numericas(df)
-                df, cols_bin = convertir_binarias_a_categoricas(df)
+        try:
+            # Misma clave para el mismo contenido, sin importar la sesión o el navegador
+            key = ingest_cache.cache_key(archivo, variante="stream" if streaming else "")
+            cached = ingest_cache.get(key)
+
+            if cached is not None:
+                df = cached["df"]
+                cols_num = cached["info"].get("cols_num", [])
+                cols_bin = cached["info"].get("cols_bin", [])
+                reporte = cached["info"].get("schema")
+                st.sidebar.info("⚡ Loaded from ingestion cache (file already parsed).")
+            elif streaming:
+                barra = st.progress(0.0, text="⏳ Streaming CSV in chunks...")
+
+                def on_progress(filas, leidos, total, filas_seg):
+                    avance = min(leidos / total, 1.0) if leidos and total else 0.0
+                    barra.progress(avance, text=f"⏳ {filas:,} rows read · {filas_seg:,.0f} rows/sec")
+
+                df, reporte = leer_csv_por_bloques(archivo, presupuesto_mb=presupuesto_mb, on_progress=on_progress)
+                barra.empty()
+                cols_num = columnas_con_accion(reporte, "to numeric", "to numeric → binary")
+                cols_bin = columnas_con_accion(reporte, "binary to categorical", "to numeric → binary")
+
+                try:
+                    ingest_cache.put(key, df, {"cols_num": cols_num, "cols_bin": cols_bin, "schema": reporte})
+                except OSError:
+                    pass
+            else:
+                with st.spinner("⏳ Reading and cleaning data..."):
+                    if es_csv:
+                        df = pd.read_csv(archivo)
+                    else:
+                        df = pd.read_excel(archivo)
+
+                    # Conversión numérica + binaria en una sola pasada por columna
+                    df, reporte = inferir_tipos(df)
+                    cols_num = columnas_con_accion(reporte, "to numeric", "to numeric → binary")
+                    cols_bin = columnas_con_accion(reporte, "binary to categorical", "to numeric → binary")
+
+                try:
+                    ingest_cache.put(key, df, {"cols_num": cols_num, "cols_bin": cols_bin, "schema": reporte})
+                except OSError:
+                    pass
 
             st.session_state.dataset_shape = (df.shape[0], df.shape[1])
+            st.session_state.schema_report = reporte
 
             if cols_num:
                 st.sidebar.info(f"🔢 Columns converted to numeric: {', '.join(cols_num)}")
             if cols_bin:
                 st.sidebar.info(f"🟩 Binary columns converted to categorical: {', '.join(cols_bin)}")
+            if reporte is not None:
+                with st.expander("🧬 Type inference report"):
+                    st.dataframe(reporte, use_container_width=True)
+
+            if compactar:
+                df, reporte_memoria = compactar_dataframe(df)
+                ahorro_mb = reporte_memoria["Saved (KB)"].sum() / 1024
+                st.sidebar.info(f"🗜️ Compact dtypes saved {ahorro_mb:,.1f} MB")
+                with st.expander("🗜️ Memory compaction report"):
+                    st.dataframe(reporte_memoria, use_container_width=True)
 
             return df
 
+        except PresupuestoExcedido as e:
+            st.error(f"❌ {e} Increase the memory budget or upload a smaller extract.")
         except Exception as e:
             st.error(f"❌ Error reading the file: **{e}**")
 
@@ -74,29 +129,32 @@ def cargar_archivo():
 # INFORMACIÓN GENERAL DEL DATASET
 # =====================================================
 
-def mostrar_info(df):
+def mostrar_info(df, version=None):
     apply_style()
     st.subheader("📋 General Information")
 
-    info_df = pd.DataFrame({
-        "Column": df.columns,
-        "Non-Null Count": df.notnull().sum().values,
-        "Null Count": df.isnull().sum().values,
-        "Dtype": df.dtypes.values
-    })
+    # Conteos leídos del perfil de columnas (se construye una vez por versión)
+    perfil = perfil_de(df, version)
+    info_df = perfil.info()
     st.markdown("<div class='stCard'>", unsafe_allow_html=True)
     st.dataframe(info_df, use_container_width=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
     st.subheader("🏷️ Categorical Columns — Unique Values")
-    cat_cols = df.select_dtypes(include="object").columns
+    cat_cols = df.select_dtypes(include=["object", "category"]).columns
 
     if len(cat_cols) > 0:
-        summary_data = [(col, df[col].unique()) for col in cat_cols]
-        summary_df = pd.DataFrame(summary_data, columns=["Column", "Unique Values"])
+        summary_data = []
+        for col in cat_cols:
+            p = perfil.columnas[col]
+            exacto = len(p.top) < CAPACIDAD_TOP
+            valores = p.mas_frecuentes(CAPACIDAD_TOP if exacto else TOP_K).index.tolist()
+            summary_data.append((col, p.n_distintos, valores if exacto else valores + ["…"]))
+        summary_df = pd.DataFrame(summary_data, columns=["Column", "Distinct", "Unique Values"])
         st.markdown("<div class='stCard'>", unsafe_allow_html=True)
         st.dataframe(summary_df, use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
+        st.caption(f"High-cardinality columns list their {TOP_K} most frequent values; distinct counts are estimated.")
     else:
         st.info("ℹ️ No categorical columns found in the dataset.")
 
@@ -104,23 +162,25 @@ def mostrar_info(df):
 # ESTADÍSTICAS DESCRIPTIVAS
 # =====================================================
 
-def mostrar_estadisticas(df):
+def mostrar_estadisticas(df, version=None):
     apply_style()
     st.subheader("📈 Descriptive Statistics")
+    perfil = perfil_de(df, version)
 
     st.markdown("#### 🔢 Numerical Features")
     st.markdown("<div class='stCard'>", unsafe_allow_html=True)
-    st.dataframe(df.describe().T, use_container_width=True)
+    st.dataframe(perfil.describe_numericas(), use_container_width=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
     st.markdown("#### 🏷️ Categorical Features")
-    cat_cols = df.select_dtypes(include="object").columns
+    cat_cols = df.select_dtypes(include=["object", "category"]).columns
     if len(cat_cols) > 0:
         st.markdown("<div class='stCard'>", unsafe_allow_html=True)
-        st.dataframe(df[cat_cols].describe().T, use_container_width=True)
+        st.dataframe(perfil.describe_categoricas(cat_cols), use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
     else:
         st.info("ℹ️ No categorical features found in this dataset.")
+    st.caption("Quartiles come from a mergeable quantile sketch: exact up to a few thousand rows, approximate above.")
 
 # =====================================================
 # PREVISUALIZACIÓN DE DATOS (con Dataset Shape)
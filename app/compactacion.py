@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+
+# =====================================================
+# TIPOS COMPACTOS (categorías + numéricos reducidos)
+# =====================================================
+
+MAX_RATIO_CATEGORIAS = 0.5   # object → category si (valores únicos / filas) no supera este ratio
+
+
+def reducir_numerica(serie):
+    # Enteros: al tipo más pequeño que los contenga. Flotantes: a float32 solo si no hay pérdida.
+    if pd.api.types.is_bool_dtype(serie):
+        return serie
+    if pd.api.types.is_integer_dtype(serie):
+        return pd.to_numeric(serie, downcast="integer")
+    if pd.api.types.is_float_dtype(serie) and serie.dtype != np.float32:
+        reducida = serie.astype(np.float32)
+        if ((reducida.astype(serie.dtype) == serie) | serie.isna()).all():
+            return reducida
+    return serie
+
+
+def es_baja_cardinalidad(serie, max_ratio=MAX_RATIO_CATEGORIAS):
+    n = len(serie)
+    return n > 0 and serie.nunique(dropna=True) <= max(1, int(n * max_ratio))
+
+
+def a_categoria(serie):
+    return serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype("category")
+
+
+def concatenar_columna(partes):
+    # Unifica las categorías para que pd.concat no degrade a object; no modifica `partes`
+    if isinstance(partes[0].dtype, pd.CategoricalDtype):
+        categorias = pd.Index([])
+        for p in partes:
+            categorias = categorias.union(p.cat.categories, sort=False)
+        partes = [p.cat.set_categories(categorias) for p in partes]
+    return pd.concat(partes, ignore_index=True)
+
+
+def compactar_dataframe(df, max_ratio=MAX_RATIO_CATEGORIAS):
+    """
+    Convierte columnas object de baja cardinalidad a `category` y reduce los
+    numéricos. Devuelve el DataFrame compacto y un reporte de bytes por columna.
+    """
+    filas = []
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        antes = int(serie.memory_usage(deep=True, index=False))
+        if serie.dtype == object and es_baja_cardinalidad(serie, max_ratio):
+            nueva = a_categoria(serie)
+        elif pd.api.types.is_numeric_dtype(serie):
+            nueva = reducir_numerica(serie)
+        else:
+            nueva = serie
+        despues = int(nueva.memory_usage(deep=True, index=False))
+        columnas[col] = nueva
+        filas.append({
+            "Column": col,
+            "Before dtype": str(serie.dtype),
+            "After dtype": "category" if isinstance(nueva.dtype, pd.CategoricalDtype) else str(nueva.dtype),
+            "Before (KB)": round(antes / 1024, 1),
+            "After (KB)": round(despues / 1024, 1),
+            "Saved (KB)": round((antes - despues) / 1024, 1),
+        })
+    compacto = pd.DataFrame(columnas, index=df.index)
+    return compacto, pd.DataFrame(filas)
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# =====================================================
+# SERVICIO DE CORRELACIONES (estadísticos suficientes)
+# =====================================================
+# Para cada par de columnas numéricas se guardan, sobre las filas donde ambas
+# tienen valor (pairwise-complete, como DataFrame.corr):
+#   n[i, j]   número de filas,
+#   sx[i, j]  suma de x_i,
+#   sxx[i, j] suma de x_i²,
+#   xy[i, j]  suma de x_i · x_j.
+# Se calculan con productos de matrices por bloques de columnas en paralelo.
+# Cada columna lleva una huella (hash de sus valores): al imputar o eliminar una
+# columna solo se recalculan su fila y su columna de la matriz.
+
+TAMANO_BLOQUE_COLUMNAS = 64
+MAX_COLUMNAS_TEXTO = 20
+MAX_ESTADISTICOS = 16
+
+
+def huella_columna(serie):
+    return hashlib.sha1(pd.util.hash_pandas_object(serie, index=True).values.tobytes()).hexdigest()
+
+
+def _matrices(df, columnas, desplazamientos):
+    # Valores centrados (menos cancelación numérica) con los nulos a 0, y máscara de válidos
+    valores = df[columnas].to_numpy(dtype=np.float64, na_value=np.nan)
+    mascara = ~np.isnan(valores)
+    x = np.where(mascara, valores - desplazamientos, 0.0)
+    return x, mascara.astype(np.float64)
+
+
+def _productos(x, m, idx):
+    xa, ma = x[:, idx], m[:, idx]
+    return {
+        "xy": xa.T @ x,
+        "sx": xa.T @ m,
+        "sxx": (xa * xa).T @ m,
+        "n": ma.T @ m,
+        # Dirección contraria, solo necesaria en las actualizaciones parciales
+        "sx_t": ma.T @ x,
+        "sxx_t": ma.T @ (x * x),
+    }
+
+
+def _en_bloques(x, m, indices, max_workers=None):
+    bloques = [indices[i:i + TAMANO_BLOQUE_COLUMNAS] for i in range(0, len(indices), TAMANO_BLOQUE_COLUMNAS)]
+    if len(bloques) <= 1:
+        return [_productos(x, m, b) for b in bloques]
+    # numpy libera el GIL en los productos de matrices: los hilos escalan con los núcleos
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(bloques), os.cpu_count() or 1)) as pool:
+        return list(pool.map(lambda b: _productos(x, m, b), bloques))
+
+
+class EstadisticosCorrelacion:
+    def __init__(self, columnas, huellas, desplazamientos, xy, sx, sxx, n):
+        self.columnas = list(columnas)
+        self.huellas = list(huellas)
+        self.desplazamientos = np.asarray(desplazamientos, dtype=np.float64)
+        self.xy, self.sx, self.sxx, self.n = xy, sx, sxx, n
+        self.columnas_recalculadas = len(self.columnas)
+
+    @classmethod
+    def calcular(cls, df, max_workers=None):
+        return cls.vacio().actualizar(df, max_workers)
+
+    @classmethod
+    def vacio(cls):
+        cero = np.zeros((0, 0))
+        return cls([], [], [], cero, cero, cero, cero)
+
+    def actualizar(self, df, max_workers=None):
+        """Estadísticos para `df` reutilizando los pares de columnas cuya huella no cambió."""
+        columnas = list(df.columns)
+        huellas = [huella_columna(df[c]) for c in columnas]
+        previas = {(c, h): i for i, (c, h) in enumerate(zip(self.columnas, self.huellas))}
+        viejos = [previas.get((c, h)) for c, h in zip(columnas, huellas)]
+        reutilizadas = np.array([i for i, v in enumerate(viejos) if v is not None], dtype=np.int64)
+        origen = np.array([v for v in viejos if v is not None], dtype=np.int64)
+        nuevas = np.array([i for i, v in enumerate(viejos) if v is None], dtype=np.int64)
+
+        desplazamientos = np.array([
+            self.desplazamientos[v] if v is not None else (df[c].mean() if df[c].notna().any() else 0.0)
+            for c, v in zip(columnas, viejos)
+        ], dtype=np.float64)
+
+        p = len(columnas)
+        mats = {k: np.empty((p, p)) for k in ("xy", "sx", "sxx", "n")}
+        if len(reutilizadas):
+            rr, oo = np.ix_(reutilizadas, reutilizadas), np.ix_(origen, origen)
+            for k in mats:
+                mats[k][rr] = getattr(self, k)[oo]
+
+        if len(nuevas):
+            x, m = _matrices(df, columnas, desplazamientos)
+            inicio = 0
+            for prod in _en_bloques(x, m, nuevas, max_workers):
+                filas = nuevas[inicio:inicio + len(prod["xy"])]
+                inicio += len(filas)
+                for k in ("xy", "n"):
+                    mats[k][filas, :] = prod[k]
+                    mats[k][:, filas] = prod[k].T
+                mats["sx"][filas, :] = prod["sx"]
+                mats["sx"][:, filas] = prod["sx_t"].T
+                mats["sxx"][filas, :] = prod["sxx"]
+                mats["sxx"][:, filas] = prod["sxx_t"].T
+
+        resultado = EstadisticosCorrelacion(columnas, huellas, desplazamientos, **mats)
+        resultado.columnas_recalculadas = len(nuevas)
+        return resultado
+
+    def correlacion(self):
+        n, sx, sxx, xy = self.n, self.sx, self.sxx, self.xy
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = n * sxx - sx * sx
+            r = (n * xy - sx * sx.T) / np.sqrt(var * var.T)
+        r[(n < 2) | (var <= 0) | (var.T <= 0)] = np.nan
+        r = np.clip(r, -1.0, 1.0)
+        return pd.DataFrame(r, index=self.columnas, columns=self.columnas)
+
+
+def top_correlaciones(corr, max_columnas):
+    """Submatriz con las columnas de mayor |r| frente a cualquier otra (vista podada)."""
+    if corr.shape[1] <= max_columnas:
+        return corr
+    fuerza = corr.abs().to_numpy(copy=True)
+    np.fill_diagonal(fuerza, np.nan)
+    maximos = pd.Series(np.nanmax(np.nan_to_num(fuerza, nan=-1.0), axis=1), index=corr.index)
+    elegidas = [c for c in corr.columns if c in set(maximos.nlargest(max_columnas).index)]
+    return corr.loc[elegidas, elegidas]
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def estadisticos_de(df, version=None):
+    """
+    Estadísticos de correlación de las columnas numéricas de `df`, cacheados por versión.
+    Una versión nueva parte de los últimos estadísticos calculados, así que solo se
+    recalculan las columnas que cambiaron.
+    """
+    num_df = df.select_dtypes(include="number")
+    clave = (version, tuple(num_df.columns))
+    with _lock:
+        if version is not None and clave in _cache:
+            _cache.move_to_end(clave)
+            return _cache[clave]
+        base = next(reversed(_cache.values())) if _cache else EstadisticosCorrelacion.vacio()
+    estad = base.actualizar(num_df)
+    if version is not None:
+        with _lock:
+            _cache[clave] = estad
+            while len(_cache) > MAX_ESTADISTICOS:
+                _cache.popitem(last=False)
+    return estad
@@ -1,16 +1,14 @@
 import os
-import joblib
 import pandas as pd
 import numpy as np
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
+from app.model_registry import models_dir as _models_dir
+from app.model_metadata import load_metadata, importances_frame
 
 
 # Helpers
-def _models_dir():
-    return os.path.join(os.path.dirname(__file__), "..", "models")
-
 def load_metrics():
     path = os.path.join(_models_dir(), "model_metrics_summary.csv")
     if not os.path.exists(path):
@@ -21,16 +19,6 @@ def load_metrics():
     df["Version"] = df["Version"].str.upper()
     return df
 
-def list_bundles():
-    md = _models_dir()
-    return sorted([f for f in os.listdir(md) if f.endswith(".pkl") and not f.startswith("model_metrics")])
-
-def load_bundle(model_name: str, version: str):
-    path = os.path.join(_models_dir(), f"{model_name.lower()}_{version.lower()}.pkl")
-    if not os.path.exists(path):
-        return None
-    return joblib.load(path)
-
 def fig_confusion(cm, labels=("No", "Yes"), title="Confusion Matrix"):
     z = np.array(cm)
     fig = go.Figure(data=go.Heatmap(
@@ -86,39 +74,23 @@ def dashboard_page(df_clean=None):
     with c3:
         show_imp = st.checkbox("Show Feature Importance", value=True)
 
-    bundle = load_bundle(mdl, version)
-    if bundle is None:
+    meta = load_metadata(mdl, version)
+    if meta is None:
         st.error("Bundle not found.")
         return
 
     # Confusion matrix (val)
-    cm = bundle.get("confusion_val", None)
+    cm = meta.get("confusion_val", None)
     if cm is not None:
         st.plotly_chart(fig_confusion(cm, labels=("No","Yes"), title=f"{mdl} - {version}"), use_container_width=True)
     else:
         st.info("Confusion matrix not stored in bundle.")
 
-    # Feature importance
+    # Feature importance (leída del sidecar, sin deserializar el modelo)
     if show_imp:
-        importances = bundle.get("feature_importances", [])
-        # Si el pipeline es 'top', en bundle guardamos selected_features
-        selected = bundle.get("selected_features", None)
-        if importances and (selected or not selected):
-            # nombres de features de salida
-            if selected:
-                feat_names = selected
-            else:
-                # Para 'all', intentamos obtener nombres del DataFramePreparer+OHE
-                # Recuperar columnas desde el paso "preprocessing"
-                try:
-                    pre = bundle["pipeline"].named_steps["preprocessing"]
-                    # Intentar atributo _columns (definido en DataFramePreparer)
-                    feat_names = list(pre._columns) if hasattr(pre, "_columns") else [f"F{i}" for i,_ in enumerate(importances)]
-                except Exception:
-                    feat_names = [f"F{i}" for i,_ in enumerate(importances)]
-
-            imp_df = pd.DataFrame({"feature": feat_names, "importance": importances}).sort_values("importance", ascending=False).head(30)
+        imp_df = importances_frame(meta, top=30)
+        if imp_df is not None:
             fig_imp = px.bar(imp_df, x="importance", y="feature", orientation="h", title="Top Feature Importances")
             st.plotly_chart(fig_imp, use_container_width=True)
         else:
-            st.info("This model does not expose feature importances or they were not saved.")
\ No newline at end of file
+            st.info("This model does not expose feature importances or they were not saved.")
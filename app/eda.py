@@ -1,26 +1,29 @@
 import streamlit as st
 import pandas as pd
 from app.utils import apply_style
+from app.versiones_dataset import AlmacenVersiones, sin_columnas
+from app.imputacion import PlanImputacion
+from app.perfil_columnas import perfil_de
+from app.muestreo import muestra_estratificada, TAMANO_MUESTRA, UMBRAL_MUESTRA
 
 # =====================================================
 # FUNCIONES DE PROCESAMIENTO
 # =====================================================
 
-def aplicar_imputaciones(df, imputaciones):
-    df_copy = df.copy()
-    for col, strat, val in imputaciones:
-        if strat == "Mean":
-            df_copy[col] = df_copy[col].fillna(df_copy[col].mean())
-        elif strat == "Median":
-            df_copy[col] = df_copy[col].fillna(df_copy[col].median())
-        elif strat == "Constant":
-            df_copy[col] = df_copy[col].fillna(val)
-        elif strat == "Delete rows":
-            df_copy = df_copy.dropna(subset=[col])
-        elif strat == "Mode":
-            moda = df_copy[col].mode()[0]
-            df_copy[col] = df_copy[col].fillna(moda)
-    return df_copy
+def aplicar_imputaciones(version, imputaciones, almacen):
+    # Plan compilado: estadísticos memorizados por versión y borrados como una sola máscara
+    plan = PlanImputacion.compilar(version.df, imputaciones, version.hash)
+    st.session_state.plan_imputacion = plan
+    return plan.aplicar_versionado(almacen, version)
+
+
+def obtener_almacen(df_original):
+    almacen = st.session_state.get("dataset_store")
+    if almacen is None or almacen.raiz is None or almacen.raiz.df is not df_original:
+        almacen = AlmacenVersiones()
+        almacen.crear_raiz(df_original)
+        st.session_state.dataset_store = almacen
+    return almacen
 
 
 def imputar_nulos(df):
@@ -86,16 +89,43 @@ def imputar_nulos(df):
                 detalle += f" ({val})"
             st.sidebar.markdown(detalle)
 
+        plan = st.session_state.get("plan_imputacion")
+        if plan is not None:
+            st.sidebar.download_button(
+                "💾 Export imputation plan (JSON)",
+                data=plan.to_json(),
+                file_name="imputation_plan.json",
+                mime="application/json",
+                help="Compiled fill values and row filters, reusable on new batches at scoring time."
+            )
+
 
-def mostrar_info(df):
+def mostrar_info(df, version=None):
     st.subheader("📋 General Information (Updated Dataset)")
-    info_df = pd.DataFrame({
-        'Column': df.columns,
-        'Non-Null Count': df.notnull().sum().values,
-        'Null Count': df.isnull().sum().values,
-        'Dtype': df.dtypes.values
-    })
-    st.dataframe(info_df)
+    st.dataframe(perfil_de(df, version).info())
+
+
+def configurar_muestra(df, version):
+    st.sidebar.subheader("🧪 Sample Mode")
+    activo = st.sidebar.checkbox(
+        "Explore a stratified sample",
+        value=len(df) > UMBRAL_MUESTRA,
+        key="sample_mode",
+        help="Interactive charts run on a cached sample stratified on the target variable. "
+             "Use 'Compute exact' on a chart to rerun it on the full data."
+    )
+    if not activo:
+        return None
+    n = st.sidebar.number_input(
+        "Sample size (rows):", min_value=1_000, max_value=10_000_000,
+        value=TAMANO_MUESTRA, step=10_000, key="sample_size"
+    )
+    if n >= len(df):
+        st.sidebar.caption("The dataset already fits in the sample size; using the full data.")
+        return None
+    muestra = muestra_estratificada(df, st.session_state.get("target_col"), int(n), version)
+    st.sidebar.caption(muestra.resumen())
+    return muestra
 
 
 # =====================================================
@@ -107,8 +137,10 @@ def ejecutar_eda(df_original):
     apply_style()
 
     # --- Tratamiento de nulos
-    df = imputar_nulos(df_original)
-    df = aplicar_imputaciones(df_original, st.session_state.get("imputaciones", []))
+    imputar_nulos(df_original)
+    almacen = obtener_almacen(df_original)
+    version = aplicar_imputaciones(almacen.raiz, st.session_state.get("imputaciones", []), almacen)
+    df = version.df
 
     # --- Control de columnas eliminadas
     if "eliminadas" not in st.session_state:
@@ -134,7 +166,14 @@ def ejecutar_eda(df_original):
         if col in st.session_state.eliminadas:
             st.session_state.eliminadas.remove(col)
 
-    df_revised = df.drop(columns=st.session_state.eliminadas, errors="ignore")
+    if st.session_state.eliminadas:
+        eliminadas = tuple(st.session_state.eliminadas)
+        version = almacen.derivar(version, ("drop", eliminadas), lambda d: sin_columnas(d, eliminadas))
+    df_revised = version.df
+
+    # Hash estable de la versión actual: otras páginas pueden cachear contra él
+    st.session_state.dataset_version = version.hash
+    st.sidebar.caption(f"🧬 Dataset version `{version.hash}` · {len(version.linaje())} step(s) from upload")
 
     if st.session_state.eliminadas:
         st.sidebar.warning(f"🗑️ Deleted columns: {', '.join(st.session_state.eliminadas)}")
@@ -148,18 +187,21 @@ def ejecutar_eda(df_original):
     st.markdown("</div>", unsafe_allow_html=True)
     st.info(f"**Final Dataset Shape:** {df_revised.shape[0]} rows × {df_revised.shape[1]} columns")
 
-    mostrar_info(df_revised)
+    mostrar_info(df_revised, version.hash)
 
     st.markdown("---")
 
+    # --- Muestra estratificada para los gráficos interactivos (None = datos completos)
+    muestra = configurar_muestra(df_revised, version.hash)
+
     # --- EDA adicional
     from app.eda_2 import ejecutar_eda_2
-    ejecutar_eda_2(df_revised)
+    ejecutar_eda_2(df_revised, version.hash, muestra)
 
     st.markdown("---")
 
     # --- EDA con variable objetivo
     from app.eda_target import ejecutar_eda_target
-    ejecutar_eda_target(df_revised)
+    ejecutar_eda_target(df_revised, muestra)
 
     return df_revised
\ No newline at end of file
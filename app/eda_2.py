@@ -1,14 +1,23 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 from app.utils import apply_style
+from app.estadisticas_grupo import (
+    codigos_grupo, histograma, tabla_contingencia, resumen_cajas_por,
+    figura_histograma, figura_cajas_por,
+)
+from app.submuestreo import submuestreo_rejilla, PRESUPUESTO_PUNTOS
+from app.perfil_columnas import perfil_de
+from app.correlaciones import estadisticos_de, top_correlaciones, MAX_COLUMNAS_TEXTO
 
 
 # =====================================================
 # KEY PERFORMANCE INDICATORS (KPIs)
 # =====================================================
-def mostrar_kpis(df):
+def mostrar_kpis(df, version=None):
     st.subheader("📈 Key Performance Indicators (KPIs)")
+    perfil = perfil_de(df, version)
 
     col1, col2, col3 = st.columns(3)
 
@@ -16,7 +25,7 @@ def mostrar_kpis(df):
     col1.metric("Total Columns", df.shape[1])
 
     total_celdas = df.shape[0] * df.shape[1]
-    total_nulos = df.isnull().sum().sum()
+    total_nulos = perfil.total_nulos
     pct_nulos = (total_nulos / total_celdas) * 100
     col2.metric("% of Null Values", f"{pct_nulos:.2f}%")
 
@@ -24,7 +33,9 @@ def mostrar_kpis(df):
     num_cols = df.select_dtypes(include="number").columns
     if len(num_cols) > 0:
         col_selec = col3.selectbox("Select numeric column for KPI:", num_cols, key="kpi_col")
-        promedio = df[col_selec].mean()
+        p = perfil.columnas[col_selec]
+        # Sin valores no nulos la media acumulada sigue en 0.0: se muestra NaN, como df[col].mean()
+        promedio = p.media if p.n else np.nan
         col3.metric(f"Average of {col_selec}", f"{promedio:.2f}")
     else:
         col3.info("There are no numeric columns in the dataset.")
@@ -33,7 +44,34 @@ def mostrar_kpis(df):
 # =====================================================
 # INTERACTIVE CHART GENERATOR
 # =====================================================
-def generador_graficos(df):
+def _histograma_agregado(df, col_x, target_col, titulo):
+    if target_col == col_x:
+        target_col = None
+    c_cod, c_etiq = codigos_grupo(df, target_col)
+    if pd.api.types.is_numeric_dtype(df[col_x]):
+        bordes, conteos = histograma(df[col_x], c_cod, len(c_etiq))
+        return figura_histograma(
+            bordes, conteos, c_etiq, col_x, titulo, nombre_grupo=target_col, barmode="group"
+        )
+    # Variables categóricas: conteos por categoría (y por clase del target)
+    nombre = target_col or "group"
+    conteos = tabla_contingencia(df[col_x], c_cod, c_etiq, nombre)
+    datos = conteos.reset_index().melt(id_vars=col_x, var_name=nombre, value_name="count")
+    return px.bar(
+        datos, x=col_x, y="count",
+        color=target_col if target_col else None,
+        barmode="group",
+        color_discrete_sequence=px.colors.sequential.Teal,
+        title=titulo
+    )
+
+
+def _suma_por_grupo(df, col_x, col_y, target_col):
+    claves = [col_x] + ([target_col] if target_col and target_col != col_x else [])
+    return df.groupby(claves, observed=True)[col_y].sum().reset_index()
+
+
+def generador_graficos(df, version=None, muestra=None):
     st.subheader("🧠 Interactive Chart Generator")
 
     # Inicializar variable target si no existe
@@ -55,6 +93,15 @@ def generador_graficos(df):
         key="target_col"
     )
 
+    # Modo muestra: los gráficos usan la muestra salvo que se pida el cálculo exacto
+    if muestra is not None:
+        exacto = st.button("🎯 Compute exact", key="exact_charts", help="Rerun the charts below on the full dataset.")
+        if exacto:
+            st.caption(f"Exact results on all {len(df):,} rows.")
+        else:
+            df, version = muestra.df, muestra.version
+            st.caption(muestra.resumen())
+
     # =====================================================
     # DISTRIBUCIÓN DEL TARGET
     # =====================================================
@@ -104,61 +151,106 @@ def generador_graficos(df):
     # =====================================================
     # CONSTRUCCIÓN DE GRÁFICOS SEGÚN SELECCIÓN
     # =====================================================
+    agregado = st.checkbox(
+        "⚡ Server-side aggregation",
+        value=True,
+        help="Pre-bins histograms, pre-aggregates bars, draws boxplots from quantiles and "
+             "downsamples scatterplots, so only small aggregates are sent to the browser."
+    )
+
     if tipo == "Histogram":
         col_x = st.selectbox("Variable (X):", df.columns)
-        fig = px.histogram(
-            df,
-            x=col_x,
-            color=target_col if target_col else None,
-            barmode="group",
-            color_discrete_sequence=px.colors.sequential.Teal,
-            title=f"{col_x} vs {target_col}" if target_col else f"Histogram of {col_x}"
-        )
+        titulo = f"{col_x} vs {target_col}" if target_col else f"Histogram of {col_x}"
+        if agregado:
+            fig = _histograma_agregado(df, col_x, target_col, titulo)
+        else:
+            fig = px.histogram(
+                df,
+                x=col_x,
+                color=target_col if target_col else None,
+                barmode="group",
+                color_discrete_sequence=px.colors.sequential.Teal,
+                title=titulo
+            )
 
     elif tipo == "Bar Chart":
         col_x = st.selectbox("Categorical Variable (X):", df.columns)
         col_y = st.selectbox("Numeric Variable (Y):", df.select_dtypes(include='number').columns)
+        titulo = f"{col_y} by {col_x} grouped by {target_col}" if target_col else f"Bar Chart of {col_y} by {col_x}"
+        # Las barras de px.bar con filas crudas se apilan: la suma por grupo es el mismo gráfico
+        datos = _suma_por_grupo(df, col_x, col_y, target_col) if agregado else df
         fig = px.bar(
-            df,
+            datos,
             x=col_x,
             y=col_y,
             color=target_col if target_col else None,
             barmode="group",
             color_discrete_sequence=px.colors.sequential.Teal,
-            title=f"{col_y} by {col_x} grouped by {target_col}" if target_col else f"Bar Chart of {col_y} by {col_x}"
+            title=titulo
         )
 
     elif tipo == "Boxplot":
         col_x = st.selectbox("Categorical Variable (X):", df.columns)
         col_y = st.selectbox("Numeric Variable (Y):", df.select_dtypes(include='number').columns)
-        fig = px.box(
-            df,
-            x=col_x,
-            y=col_y,
-            color=target_col if target_col else None,
-            color_discrete_sequence=px.colors.sequential.Teal,
-            title=f"{col_y} by {col_x} grouped by {target_col}" if target_col else f"Boxplot of {col_y} by {col_x}"
-        )
+        titulo = f"{col_y} by {col_x} grouped by {target_col}" if target_col else f"Boxplot of {col_y} by {col_x}"
+        if agregado:
+            resumen, x_etiq, c_etiq = resumen_cajas_por(df, col_x, col_y, target_col)
+            fig = figura_cajas_por(resumen, x_etiq, c_etiq, col_x, col_y, titulo, nombre_grupo=target_col)
+        else:
+            fig = px.box(
+                df,
+                x=col_x,
+                y=col_y,
+                color=target_col if target_col else None,
+                color_discrete_sequence=px.colors.sequential.Teal,
+                title=titulo
+            )
 
     elif tipo == "Scatterplot":
         col_x = st.selectbox("Numeric Variable (X):", df.select_dtypes(include='number').columns)
         col_y = st.selectbox("Numeric Variable (Y):", df.select_dtypes(include='number').columns)
+        titulo = f"{col_y} vs {col_x} grouped by {target_col}" if target_col else f"Scatterplot of {col_y} vs {col_x}"
+        datos = df
+        if agregado:
+            presupuesto = st.number_input(
+                "Scatter point budget:", min_value=1_000, max_value=500_000,
+                value=PRESUPUESTO_PUNTOS, step=5_000
+            )
+            idx = submuestreo_rejilla(df[col_x], df[col_y], presupuesto)
+            if len(idx) < len(df):
+                datos = df.iloc[idx]
+                st.caption(f"Showing {len(idx):,} of {len(df):,} points (grid-binned, density-preserving downsampling).")
         fig = px.scatter(
-            df,
+            datos,
             x=col_x,
             y=col_y,
             color=target_col if target_col else None,
             color_discrete_sequence=px.colors.sequential.Teal,
-            title=f"{col_y} vs {col_x} grouped by {target_col}" if target_col else f"Scatterplot of {col_y} vs {col_x}"
+            render_mode="webgl" if agregado else "auto",
+            title=titulo
         )
 
     elif tipo == "Heatmap (Correlation)":
         num_df = df.select_dtypes(include='number')
         if num_df.shape[1] > 1:
-            corr = num_df.corr()
+            # Estadísticos suficientes cacheados por versión: solo se recalculan las columnas que cambian
+            estad = estadisticos_de(num_df, version)
+            corr = estad.correlacion()
+            if corr.shape[1] > MAX_COLUMNAS_TEXTO:
+                max_cols = st.slider(
+                    "Top correlated features shown:", min_value=2, max_value=corr.shape[1],
+                    value=min(30, corr.shape[1]),
+                    help="Keeps the features with the strongest |r| against any other feature."
+                )
+                corr = top_correlaciones(corr, max_cols)
+            if estad.columnas_recalculadas < num_df.shape[1]:
+                st.caption(
+                    f"Correlations updated incrementally: {estad.columnas_recalculadas} of "
+                    f"{num_df.shape[1]} numeric columns recomputed."
+                )
             fig = px.imshow(
                 corr,
-                text_auto=True,
+                text_auto=".2f" if corr.shape[1] <= MAX_COLUMNAS_TEXTO else False,
                 color_continuous_scale="RdBu_r",
                 title="Correlation Heatmap"
             )
@@ -188,8 +280,8 @@ def generador_graficos(df):
 # =====================================================
 # FUNCIÓN PRINCIPAL DE KPIs + GRÁFICOS
 # =====================================================
-def ejecutar_eda_2(df):
+def ejecutar_eda_2(df, version=None, muestra=None):
     apply_style()
 
-    mostrar_kpis(df)
-    generador_graficos(df)
+    mostrar_kpis(df, version)
+    generador_graficos(df, version, muestra)
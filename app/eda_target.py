@@ -1,137 +1,173 @@
+import threading
+from collections import OrderedDict
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 from app.utils import apply_style
+from app.estadisticas_grupo import calcular_estadisticas, figura_cajas, figura_histograma
+from app.muestreo import margen_error
+
+# Agregados y figuras por (versión del dataset, columna, target), compartidos entre reruns y sesiones
+MAX_FIGURAS = 256
+_cache_figuras = OrderedDict()
+_lock = threading.Lock()
 
 # =====================================================
 # AUTOMATIC ANALYSIS VS TARGET
 # =====================================================
-def analizar_vs_target(df, target_col):
-    st.subheader(f"🎯 Automatic Analysis with respect to Target Variable: `{target_col}`")
-
-    if target_col not in df.columns:
-        st.warning("⚠️ The target variable is not in the dataset.")
-        return
-
-    n_clases = df[target_col].nunique()
-    if n_clases > 20:
-        st.error(f"🚫 The target variable has {n_clases} unique classes — too many for automatic analysis.")
-        return
+def _estilo(fig):
+    fig.update_layout(
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        font=dict(color="#fafafa", family="Inter"),
+        title=dict(
+            text=fig.layout.title.text,
+            x=0,
+            font=dict(size=18, color="#00bcd4")
+        ),
+        margin=dict(t=60, b=40),
+    )
+    return fig
+
+def _analisis_columna(estad, col, target_col, total=None):
+    # Devuelve los elementos a dibujar para una columna: ("chart", figura) o ("table", DataFrame)
+    # `total` = filas del dataset completo cuando `estad` viene de una muestra (añade márgenes de error)
+    elementos = []
+
+    # =====================================================
+    # NUMÉRICAS
+    # =====================================================
+    if col in estad["cajas"]:
+        # Boxplot (desde cuartiles precalculados)
+        fig_box = figura_cajas(
+            estad["cajas"][col], col, target_col, f"Distribution of {col} by {target_col}"
+        )
+        elementos.append(("chart", _estilo(fig_box)))
+
+        # Histograma (desde bins precalculados)
+        bordes, conteos = estad["histogramas"][col]
+        fig_hist = figura_histograma(
+            bordes, conteos, estad["clases"], col,
+            f"Histogram of {col} grouped by {target_col}", nombre_grupo=target_col
+        )
+        elementos.append(("chart", _estilo(fig_hist)))
+
+    # =====================================================
+    # CATEGÓRICAS
+    # =====================================================
+    else:
+        # Una sola tabla de contingencia sirve para el gráfico y para la tabla
+        conteos = estad["contingencias"][col]
+        tabla = conteos.div(conteos.sum(axis=1), axis=0) * 100
+        cross_tab = tabla.reset_index().melt(
+            id_vars=col, var_name=target_col, value_name="Percentage"
+        )
+        margen = None
+        if total is not None:
+            # Semiancho del intervalo al 95% de cada porcentaje (n = filas de la categoría en la muestra)
+            n_fila = conteos.sum(axis=1)
+            margen = pd.DataFrame(
+                margen_error(tabla.to_numpy() / 100, n_fila.to_numpy()[:, None], total) * 100,
+                index=tabla.index, columns=tabla.columns,
+            )
+            cross_tab["± 95%"] = margen.reset_index().melt(id_vars=col, value_name="m")["m"].to_numpy()
 
-    for col in df.columns:
-        if col == target_col:
-            continue
-
-        st.markdown(f"### 📊 {col} vs {target_col}")
-
-        # =====================================================
-        # NUMÉRICAS
-        # =====================================================
-        if pd.api.types.is_numeric_dtype(df[col]):
-            # Boxplot
-            fig_box = px.box(
-                df,
-                x=target_col,
-                y=col,
+        if len(tabla) == 2:
+            # Binarias → barras agrupadas con texto dentro
+            fig = px.bar(
+                cross_tab,
+                x=col,
+                y="Percentage",
                 color=target_col,
-                title=f"Distribution of {col} by {target_col}",
+                text="Percentage",
+                error_y="± 95%" if margen is not None else None,
+                barmode="group",
+                title=f"Percentage distribution of {col} by {target_col}",
                 color_discrete_sequence=px.colors.sequential.Teal,
             )
-            fig_box.update_layout(
-                plot_bgcolor="#0e1117",
-                paper_bgcolor="#0e1117",
-                font=dict(color="#fafafa", family="Inter"),
-                title=dict(
-                    text=fig_box.layout.title.text,
-                    x=0,
-                    font=dict(size=18, color="#00bcd4")
-                ),
-                margin=dict(t=60, b=40),
-            )
-            st.plotly_chart(fig_box, use_container_width=True)
-
-            # Histograma
-            fig_hist = px.histogram(
-                df,
+            fig.update_traces(texttemplate="%{text:.1f}%", textposition="inside")
+        else:
+            # Categóricas → barras apiladas
+            fig = px.bar(
+                cross_tab,
                 x=col,
+                y="Percentage",
                 color=target_col,
-                barmode="overlay",
-                opacity=0.7,
-                title=f"Histogram of {col} grouped by {target_col}",
+                barmode="stack",
+                title=f"Percentage distribution of {col} by {target_col}",
                 color_discrete_sequence=px.colors.sequential.Teal,
             )
-            fig_hist.update_layout(
-                plot_bgcolor="#0e1117",
-                paper_bgcolor="#0e1117",
-                font=dict(color="#fafafa", family="Inter"),
-                title=dict(
-                    text=fig_hist.layout.title.text,
-                    x=0,
-                    font=dict(size=18, color="#00bcd4")
-                ),
-                margin=dict(t=60, b=40),
-            )
-            st.plotly_chart(fig_hist, use_container_width=True)
+        elementos.append(("chart", _estilo(fig)))
 
-        # =====================================================
-        # CATEGÓRICAS
-        # =====================================================
-        else:
-            n_unicos = df[col].nunique()
-            cross_tab = pd.crosstab(df[col], df[target_col], normalize="index") * 100
-            cross_tab = cross_tab.reset_index().melt(
-                id_vars=col, var_name=target_col, value_name="Percentage"
-            )
+        # Tabla de distribución
+        if margen is not None:
+            tabla = tabla.assign(**{"± 95% (max)": margen.max(axis=1)})
+        elementos.append(("table", tabla.round(2)))
 
-            if n_unicos == 2:
-                # Binarias → barras agrupadas con texto dentro
-                fig = px.bar(
-                    cross_tab,
-                    x=col,
-                    y="Percentage",
-                    color=target_col,
-                    text="Percentage",
-                    barmode="group",
-                    title=f"Percentage distribution of {col} by {target_col}",
-                    color_discrete_sequence=px.colors.sequential.Teal,
-                )
-                fig.update_traces(texttemplate="%{text:.1f}%", textposition="inside")
-            else:
-                # Categóricas → barras apiladas
-                fig = px.bar(
-                    cross_tab,
-                    x=col,
-                    y="Percentage",
-                    color=target_col,
-                    barmode="stack",
-                    title=f"Percentage distribution of {col} by {target_col}",
-                    color_discrete_sequence=px.colors.sequential.Teal,
-                )
-
-            fig.update_layout(
-                plot_bgcolor="#0e1117",
-                paper_bgcolor="#0e1117",
-                font=dict(color="#fafafa", family="Inter"),
-                title=dict(
-                    text=fig.layout.title.text,
-                    x=0,
-                    font=dict(size=18, color="#00bcd4")
-                ),
-                margin=dict(t=60, b=40),
-            )
-            st.plotly_chart(fig, use_container_width=True)
+    return elementos
+
+
+def _memo(clave, calcular):
+    if clave[0] is None:
+        return calcular()
+    with _lock:
+        if clave in _cache_figuras:
+            _cache_figuras.move_to_end(clave)
+            return _cache_figuras[clave]
+    valor = calcular()
+    with _lock:
+        _cache_figuras[clave] = valor
+        while len(_cache_figuras) > MAX_FIGURAS:
+            _cache_figuras.popitem(last=False)
+    return valor
+
+
+def analizar_vs_target(df, target_col, version=None, total=None):
+    st.subheader(f"🎯 Automatic Analysis with respect to Target Variable: `{target_col}`")
+
+    if target_col not in df.columns:
+        st.warning("⚠️ The target variable is not in the dataset.")
+        return
 
-            # Tabla de distribución
-            st.markdown("##### 📋 Distribution Table (% by row)")
-            tabla = pd.crosstab(df[col], df[target_col], normalize="index") * 100
-            st.dataframe(tabla.round(2), use_container_width=True)
+    n_clases = df[target_col].nunique()
+    if n_clases > 20:
+        st.error(f"🚫 The target variable has {n_clases} unique classes — too many for automatic analysis.")
+        return
 
-        st.markdown("<hr style='border: 1px solid #1f2937; margin: 40px 0;'>", unsafe_allow_html=True)
+    columnas = [c for c in df.columns if c != target_col]
+
+    # Solo se calculan (y se envían al navegador) las columnas de la página visible
+    c1, c2, c3 = st.columns([2, 1, 1])
+    with c1:
+        elegidas = st.multiselect("Jump to columns (optional):", columnas, key="target_cols_filter")
+    with c2:
+        por_pagina = st.selectbox("Columns per page:", [3, 5, 10, 20], index=1, key="target_page_size")
+    if elegidas:
+        visibles = elegidas
+    else:
+        n_paginas = max(1, -(-len(columnas) // por_pagina))
+        with c3:
+            pagina = st.number_input("Page:", min_value=1, max_value=n_paginas, value=1, step=1, key="target_page")
+        visibles = columnas[(pagina - 1) * por_pagina: pagina * por_pagina]
+        st.caption(f"Page {pagina} of {n_paginas} · {len(columnas)} columns analysed against `{target_col}`")
+
+    # Agregados de todas las columnas en una pasada, una vez por (versión, target)
+    estad = _memo((version, "__stats__", target_col), lambda: calcular_estadisticas(df, target_col))
+
+    for col in visibles:
+        with st.expander(f"📊 {col} vs {target_col}", expanded=True):
+            for tipo, elemento in _memo((version, col, target_col), lambda: _analisis_columna(estad, col, target_col, total)):
+                if tipo == "chart":
+                    st.plotly_chart(elemento, use_container_width=True)
+                else:
+                    st.markdown("##### 📋 Distribution Table (% by row)")
+                    st.dataframe(elemento, use_container_width=True)
 
 # =====================================================
 # FUNCIÓN PRINCIPAL
 # =====================================================
-def ejecutar_eda_target(df):
+def ejecutar_eda_target(df, muestra=None):
     apply_style()
 
     target_col = st.session_state.get("target_col", None)
@@ -140,4 +176,12 @@ def ejecutar_eda_target(df):
         st.info("ℹ️ A target variable has not yet been defined.")
         return
 
-    analizar_vs_target(df, target_col)
\ No newline at end of file
+    version, total = st.session_state.get("dataset_version"), None
+    if muestra is not None and muestra.target == target_col:
+        if st.button("🎯 Compute exact", key="exact_target", help="Rerun this analysis on the full dataset."):
+            st.caption(f"Exact results on all {len(df):,} rows.")
+        else:
+            df, version, total = muestra.df, muestra.version, muestra.total
+            st.caption(muestra.resumen())
+
+    analizar_vs_target(df, target_col, version, total)
\ No newline at end of file
@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+# =====================================================
+# MOTOR DE ESTADÍSTICAS AGRUPADAS (columna × target)
+# =====================================================
+# Una sola pasada vectorizada produce, para todas las columnas a la vez:
+#   - tablas de contingencia (categóricas),
+#   - estadísticos de caja por clase (cuartiles, bigotes, media),
+#   - histogramas binned por clase.
+# Los gráficos se dibujan después a partir de estos agregados pequeños, sin
+# volver a enviar las filas crudas al navegador.
+
+N_BINS = 30
+CUANTILES = [0.25, 0.5, 0.75]
+
+
+def codificar(serie):
+    """Códigos enteros (−1 = nulo) y etiquetas ordenadas de una serie."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.cat.remove_unused_categories()
+        return serie.cat.codes.to_numpy(), list(serie.cat.categories)
+    codigos, etiquetas = pd.factorize(serie, sort=True)
+    return codigos, list(etiquetas)
+
+
+def tabla_contingencia(serie, g_codigos, g_etiquetas, nombre_grupo):
+    # Conteos columna × grupo con un único bincount
+    codigos, etiquetas = codificar(serie)
+    n_g = len(g_etiquetas)
+    validos = (codigos >= 0) & (g_codigos >= 0)
+    conteos = np.bincount(
+        codigos[validos] * n_g + g_codigos[validos], minlength=len(etiquetas) * n_g
+    ).reshape(len(etiquetas), n_g)
+    tabla = pd.DataFrame(
+        conteos,
+        index=pd.Index(etiquetas, name=serie.name),
+        columns=pd.Index(g_etiquetas, name=nombre_grupo),
+    )
+    return tabla[tabla.sum(axis=1) > 0]
+
+
+def resumen_cajas(df, columnas, g_codigos, g_etiquetas):
+    """Por columna numérica: DataFrame (una fila por grupo) con q1, median, q3, bigotes, media y n."""
+    if not columnas:
+        return {}
+    validos = g_codigos >= 0
+    datos = df.loc[validos, columnas]
+    grupos = g_codigos[validos]
+    agrupado = datos.groupby(grupos)
+
+    cuartiles = agrupado.quantile(CUANTILES)
+    medias = agrupado.mean()
+    conteos = agrupado.count()
+
+    resumen = {}
+    for col in columnas:
+        q = cuartiles[col].unstack()
+        q1, med, q3 = q[0.25], q[0.5], q[0.75]
+        iqr = q3 - q1
+        x = datos[col].to_numpy(dtype=float)
+        # Bigotes al estilo de Plotly: valores extremos dentro de 1.5 × IQR
+        li = (q1 - 1.5 * iqr).reindex(range(len(g_etiquetas))).to_numpy()[grupos]
+        ls = (q3 + 1.5 * iqr).reindex(range(len(g_etiquetas))).to_numpy()[grupos]
+        bajo = pd.Series(np.where(x >= li, x, np.nan)).groupby(grupos).min()
+        alto = pd.Series(np.where(x <= ls, x, np.nan)).groupby(grupos).max()
+        tabla = pd.DataFrame({
+            "q1": q1, "median": med, "q3": q3,
+            "lowerfence": bajo, "upperfence": alto,
+            "mean": medias[col], "n": conteos[col],
+        })
+        tabla.index = [g_etiquetas[i] for i in tabla.index]
+        resumen[col] = tabla
+    return resumen
+
+
+def histograma(serie, g_codigos, n_g, bins=N_BINS):
+    """Bordes de los bins y conteos por grupo (matriz n_g × bins); n_g=1 sin agrupación."""
+    x = serie.to_numpy(dtype=float)
+    validos = ~np.isnan(x) & (g_codigos >= 0)
+    x, g = x[validos], g_codigos[validos]
+    if len(x) == 0:
+        return np.array([0.0, 1.0]), np.zeros((n_g, 1), dtype=int)
+    bordes = np.histogram_bin_edges(x, bins=bins)
+    idx = np.clip(np.searchsorted(bordes, x, side="right") - 1, 0, len(bordes) - 2)
+    conteos = np.bincount(g * (len(bordes) - 1) + idx, minlength=n_g * (len(bordes) - 1))
+    return bordes, conteos.reshape(n_g, len(bordes) - 1)
+
+
+def codigos_grupo(df, color_col=None):
+    """Códigos del agrupador opcional (p.ej. el target); un único grupo si no hay."""
+    if color_col:
+        return codificar(df[color_col])
+    return np.zeros(len(df), dtype=np.int64), ["all"]
+
+
+def resumen_cajas_por(df, col_x, col_y, color_col=None, max_categorias=50):
+    """Cajas de `col_y` por cada (categoría de col_x, grupo de color) en una pasada."""
+    x_cod, x_etiq = codificar(df[col_x])
+    c_cod, c_etiq = codigos_grupo(df, color_col)
+    if len(x_etiq) > max_categorias:
+        # Solo las categorías más frecuentes; el resto no se dibuja
+        frecuentes = np.argsort(-np.bincount(x_cod[x_cod >= 0], minlength=len(x_etiq)))[:max_categorias]
+        mapa = np.full(len(x_etiq), -1)
+        mapa[np.sort(frecuentes)] = np.arange(len(frecuentes))
+        x_cod = np.where(x_cod >= 0, mapa[x_cod], -1)
+        x_etiq = [x_etiq[i] for i in np.sort(frecuentes)]
+    n_c = len(c_etiq)
+    grupos = np.where((x_cod >= 0) & (c_cod >= 0), x_cod * n_c + c_cod, -1)
+    resumen = resumen_cajas(df, [col_y], grupos, list(range(len(x_etiq) * n_c)))[col_y]
+    return resumen, x_etiq, c_etiq
+
+
+def calcular_estadisticas(df, target_col, bins=N_BINS):
+    """Todos los agregados columna × target en una pasada."""
+    g_codigos, g_etiquetas = codificar(df[target_col])
+    columnas = [c for c in df.columns if c != target_col]
+    numericas = [c for c in columnas if pd.api.types.is_numeric_dtype(df[c])]
+
+    estad = {
+        "target": target_col,
+        "clases": g_etiquetas,
+        "n": int((g_codigos >= 0).sum()),
+        "cajas": resumen_cajas(df, numericas, g_codigos, g_etiquetas),
+        "histogramas": {c: histograma(df[c], g_codigos, len(g_etiquetas), bins) for c in numericas},
+        "contingencias": {
+            c: tabla_contingencia(df[c], g_codigos, g_etiquetas, target_col)
+            for c in columnas if c not in numericas
+        },
+    }
+    return estad
+
+
+# =====================================================
+# FIGURAS A PARTIR DE AGREGADOS
+# =====================================================
+
+PALETA = px.colors.sequential.Teal
+
+
+def _color(i):
+    return PALETA[i % len(PALETA)]
+
+
+def figura_cajas(resumen, col, eje_x, titulo):
+    # Boxplot precalculado: Plotly solo recibe cuartiles y bigotes, no las filas
+    fig = go.Figure()
+    for i, (clase, fila) in enumerate(resumen.iterrows()):
+        fig.add_trace(go.Box(
+            name=str(clase), x=[str(clase)],
+            q1=[fila["q1"]], median=[fila["median"]], q3=[fila["q3"]],
+            lowerfence=[fila["lowerfence"]], upperfence=[fila["upperfence"]],
+            mean=[fila["mean"]], marker_color=_color(i), boxpoints=False,
+        ))
+    fig.update_layout(title=titulo, xaxis_title=eje_x, yaxis_title=col, legend_title_text=eje_x)
+    return fig
+
+
+def figura_histograma(bordes, conteos, etiquetas, col, titulo, nombre_grupo=None, barmode="overlay"):
+    centros = (bordes[:-1] + bordes[1:]) / 2
+    # En modo overlay cada barra ocupa el bin completo; en modo group Plotly reparte el ancho
+    ancho = float(bordes[1] - bordes[0]) if barmode == "overlay" and len(bordes) > 1 else None
+    fig = go.Figure()
+    for i, etiqueta in enumerate(etiquetas):
+        fig.add_trace(go.Bar(
+            x=centros, y=conteos[i], width=ancho, name=str(etiqueta),
+            marker_color=_color(i), opacity=0.7 if len(etiquetas) > 1 else 1.0,
+        ))
+    fig.update_layout(
+        title=titulo, barmode=barmode, bargap=0 if barmode == "overlay" else 0.1, xaxis_title=col, yaxis_title="count",
+        legend_title_text=nombre_grupo or "", showlegend=nombre_grupo is not None,
+    )
+    return fig
+
+
+def figura_cajas_por(resumen, x_etiq, c_etiq, col_x, col_y, titulo, nombre_grupo=None):
+    fig = go.Figure()
+    n_c = len(c_etiq)
+    for ci, etiqueta in enumerate(c_etiq):
+        filas = resumen.loc[[g for g in resumen.index if g % n_c == ci]]
+        if filas.empty:
+            continue
+        fig.add_trace(go.Box(
+            name=str(etiqueta), x=[str(x_etiq[g // n_c]) for g in filas.index],
+            q1=filas["q1"], median=filas["median"], q3=filas["q3"],
+            lowerfence=filas["lowerfence"], upperfence=filas["upperfence"], mean=filas["mean"],
+            marker_color=_color(ci), boxpoints=False,
+        ))
+    fig.update_layout(
+        title=titulo, boxmode="group", xaxis_title=col_x, yaxis_title=col_y,
+        legend_title_text=nombre_grupo or "", showlegend=nombre_grupo is not None,
+    )
+    return fig
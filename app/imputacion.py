@@ -0,0 +1,139 @@
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from app.versiones_dataset import con_columna
+
+
+# =====================================================
+# MOTOR DE IMPUTACIÓN INCREMENTAL
+# =====================================================
+# La lista de imputaciones (columna, estrategia, valor) se compila en un plan:
+#   - "Delete rows" se convierte en una única máscara de filas,
+#   - cada relleno guarda su valor ya calculado (media, mediana, moda, constante).
+# Los estadísticos se memorizan por (versión del dataset, columna, estrategia,
+# máscara previa), así que al añadir una imputación solo se calcula la nueva.
+# El plan compilado se puede exportar a JSON y aplicar a lotes nuevos.
+
+ESTRATEGIAS_CONSTANTE = ("Constant", "Constant Value")
+MAX_MEMO = 1024
+
+_memo = OrderedDict()
+_lock = threading.Lock()
+
+
+def _memorizar(clave, calcular):
+    with _lock:
+        if clave in _memo:
+            _memo.move_to_end(clave)
+            return _memo[clave]
+    valor = calcular()
+    with _lock:
+        _memo[clave] = valor
+        while len(_memo) > MAX_MEMO:
+            _memo.popitem(last=False)
+    return valor
+
+
+def _a_python(valor):
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+def _estadistico(serie, strat, val):
+    if strat == "Mean":
+        return _a_python(serie.mean())
+    if strat == "Median":
+        return _a_python(serie.median())
+    if strat == "Mode":
+        moda = serie.mode()
+        return _a_python(moda.iloc[0]) if len(moda) else None
+    if strat in ESTRATEGIAS_CONSTANTE:
+        return val
+    return None
+
+
+def _mascara(df, columnas):
+    mascara = np.ones(len(df), dtype=bool)
+    for col in columnas:
+        mascara &= df[col].notna().to_numpy()
+    return mascara
+
+
+class PlanImputacion:
+    """Plan compilado: columnas cuyas filas nulas se eliminan + valores de relleno."""
+
+    def __init__(self, eliminar_filas=(), rellenos=None, pasos=()):
+        self.eliminar_filas = tuple(eliminar_filas)
+        self.rellenos = dict(rellenos or {})
+        self.pasos = tuple(pasos)
+
+    @classmethod
+    def compilar(cls, df, imputaciones, hash_version=None):
+        eliminar, rellenos = [], {}
+        for col, strat, val in imputaciones:
+            if col not in df.columns:
+                continue
+            if strat == "Delete rows":
+                eliminar.append(col)
+                continue
+            # El estadístico se calcula sobre las filas que sobreviven a los borrados previos,
+            # igual que al aplicar las imputaciones una tras otra
+            previas = tuple(eliminar)
+            if strat in ESTRATEGIAS_CONSTANTE:
+                valor = val
+            else:
+                clave = (hash_version or id(df), col, strat, previas)
+                valor = _memorizar(
+                    clave,
+                    lambda: _estadistico(df[col][_mascara(df, previas)] if previas else df[col], strat, val),
+                )
+            if valor is not None:
+                rellenos[col] = valor
+        return cls(eliminar, rellenos, imputaciones)
+
+    def aplicar(self, df, eliminar_filas=True):
+        if eliminar_filas and self.eliminar_filas:
+            cols = [c for c in self.eliminar_filas if c in df.columns]
+            df = df[_mascara(df, cols)]
+        for col, valor in self.rellenos.items():
+            if col in df.columns and df[col].isna().any():
+                df = con_columna(df, col, rellenar(df[col], valor))
+        return df
+
+    def aplicar_versionado(self, almacen, version):
+        # Un paso versionado por borrado/relleno: al cambiar el plan solo se recalculan
+        # las columnas afectadas; el resto de versiones ya existe en el almacén
+        if self.eliminar_filas:
+            cols = self.eliminar_filas
+            version = almacen.derivar(version, ("delete_rows", cols), lambda d: d[_mascara(d, cols)])
+        for col, valor in self.rellenos.items():
+            version = almacen.derivar(
+                version, ("fill", col, valor), lambda d: con_columna(d, col, rellenar(d[col], valor))
+            )
+        return version
+
+    # --- Exportación para aplicar el mismo plan al puntuar lotes nuevos
+    def to_dict(self):
+        return {
+            "steps": [{"column": c, "strategy": s, "value": _a_python(v)} for c, s, v in self.pasos],
+            "delete_rows": list(self.eliminar_filas),
+            "fill_values": {c: _a_python(v) for c, v in self.rellenos.items()},
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, default=str)
+
+    @classmethod
+    def from_dict(cls, data):
+        pasos = [(p["column"], p["strategy"], p.get("value")) for p in data.get("steps", [])]
+        return cls(data.get("delete_rows", []), data.get("fill_values", {}), pasos)
+
+
+def rellenar(serie, valor):
+    # En columnas category el valor de relleno debe existir como categoría
+    if isinstance(serie.dtype, pd.CategoricalDtype) and valor not in serie.cat.categories:
+        serie = serie.cat.add_categories([valor])
+    return serie.fillna(valor)
@@ -0,0 +1,107 @@
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+# =====================================================
+# MOTOR DE INFERENCIA DE TIPOS
+# =====================================================
+# Cada columna se decide primero sobre una muestra acotada; solo las columnas
+# cuya muestra pasa (o queda en zona de duda) se convierten completas. Las
+# columnas se evalúan en paralelo con hilos y ninguna columna rechazada se copia.
+
+TAMANO_MUESTRA = 10_000
+UMBRAL_NAN = 0.4           # > 40% de NaN tras la conversión → la columna no es numérica
+Z_RECHAZO = 3.0            # margen (en errores estándar) para rechazar solo con la muestra
+VALORES_BINARIOS = [0, 1]
+
+
+def _muestra(serie, tamano):
+    # Filas espaciadas uniformemente: es un slice (vista), sin copia ni aleatoriedad
+    paso = max(1, len(serie) // tamano)
+    return serie.iloc[::paso]
+
+
+def _rechazo_por_muestra(ratio, n):
+    if n == 0:
+        return False
+    se = math.sqrt(max(ratio * (1 - ratio), 1e-12) / n)
+    return ratio - UMBRAL_NAN > Z_RECHAZO * se
+
+
+def _inferir_numerica(serie, tamano):
+    """Devuelve (serie convertida o None, ratio de NaN en la muestra, 'sample'/'full')."""
+    muestra = _muestra(serie, tamano)
+    ratio_muestra = float(pd.to_numeric(muestra, errors="coerce").isna().mean()) if len(muestra) else 0.0
+    if _rechazo_por_muestra(ratio_muestra, len(muestra)):
+        return None, ratio_muestra, "sample"
+
+    convertida = pd.to_numeric(serie, errors="coerce")
+    if convertida.isna().mean() > UMBRAL_NAN:
+        return None, ratio_muestra, "full"
+    return convertida, ratio_muestra, "full"
+
+
+def _es_binaria(serie, tamano):
+    muestra = _muestra(serie, tamano)
+    if not (muestra.isin(VALORES_BINARIOS) | muestra.isna()).all():
+        return False, "sample"
+    return bool((serie.isin(VALORES_BINARIOS) | serie.isna()).all()), "full"
+
+
+def _analizar_columna(col, serie, tamano, numericas, binarias):
+    fila = {
+        "Column": col,
+        "Original dtype": str(serie.dtype),
+        "Inferred type": "numeric" if pd.api.types.is_numeric_dtype(serie) else "categorical",
+        "Action": "kept",
+        "Sample NaN %": None,
+        "Decided on": "dtype",
+    }
+    nueva = None
+
+    if numericas and serie.dtype == object:
+        convertida, ratio, decidido = _inferir_numerica(serie, tamano)
+        fila["Sample NaN %"] = round(ratio * 100, 2)
+        fila["Decided on"] = decidido
+        if convertida is not None:
+            nueva = convertida
+            fila["Inferred type"] = "numeric"
+            fila["Action"] = "to numeric"
+
+    actual = nueva if nueva is not None else serie
+    if binarias and pd.api.types.is_numeric_dtype(actual):
+        binaria, decidido = _es_binaria(actual, tamano)
+        if binaria:
+            nueva = actual.map({0: "No", 1: "Yes"}).astype("object")
+            fila["Inferred type"] = "binary"
+            fila["Action"] = "binary to categorical" if fila["Action"] == "kept" else "to numeric → binary"
+            fila["Decided on"] = decidido
+
+    return col, nueva, fila
+
+
+def inferir_tipos(df, tamano_muestra=TAMANO_MUESTRA, numericas=True, binarias=True, max_workers=None):
+    """
+    Convierte columnas object mal tipadas a numéricas y columnas numéricas 0/1 a
+    categóricas Yes/No. Devuelve el DataFrame y un reporte con el esquema inferido.
+    """
+    max_workers = max_workers or min(8, (os.cpu_count() or 1) + 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        resultados = list(pool.map(
+            lambda col: _analizar_columna(col, df[col], tamano_muestra, numericas, binarias),
+            df.columns,
+        ))
+
+    for col, nueva, _ in resultados:
+        if nueva is not None:
+            df[col] = nueva
+
+    reporte = pd.DataFrame([fila for _, _, fila in resultados])
+    return df, reporte
+
+
+def columnas_con_accion(reporte, *acciones):
+    return reporte.loc[reporte["Action"].isin(acciones), "Column"].tolist()
@@ -0,0 +1,99 @@
+import os
+import pickle
+import hashlib
+import tempfile
+import threading
+
+
+# =====================================================
+# CACHÉ DE INGESTA EN DISCO (clave = hash del contenido)
+# =====================================================
+# El DataFrame ya limpio se guarda con pickle protocolo 5, que escribe los
+# buffers de numpy casi sin sobrecoste. Al ser un directorio en disco, la caché
+# es compartida por todas las sesiones (y sobrevive a reinicios del servidor).
+
+CACHE_DIR = os.environ.get(
+    "CHURN_INGEST_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".cache", "ingest")),
+)
+CACHE_BUDGET_MB = float(os.environ.get("CHURN_INGEST_CACHE_MB", 2048))
+
+# Subir este número cuando cambie la lógica de limpieza, para no servir resultados viejos
+PARSER_VERSION = 2
+
+_lock = threading.Lock()
+
+
+def content_hash(archivo, block_size=1 << 22):
+    h = hashlib.sha256()
+    buf = archivo.getbuffer() if hasattr(archivo, "getbuffer") else memoryview(archivo.getvalue())
+    for start in range(0, len(buf), block_size):
+        h.update(buf[start:start + block_size])
+    return h.hexdigest()
+
+
+def cache_key(archivo, variante=""):
+    ext = os.path.splitext(archivo.name)[1].lower().lstrip(".")
+    if variante:
+        ext = f"{ext}-{variante}"
+    return f"{content_hash(archivo)}-{ext}-v{PARSER_VERSION}"
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, f"{key}.pkl")
+
+
+def get(key):
+    path = _path(key)
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    # Marca de uso para la política LRU
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return payload
+
+
+def put(key, df, info=None):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Escritura atómica: otra sesión nunca lee un archivo a medio escribir
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({"df": df, "info": info or {}}, f, protocol=5)
+        os.replace(tmp, _path(key))
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _evict()
+
+
+def _evict():
+    budget = int(CACHE_BUDGET_MB * 1024 * 1024)
+    with _lock:
+        files = []
+        for fname in os.listdir(CACHE_DIR):
+            if not fname.endswith(".pkl"):
+                continue
+            path = os.path.join(CACHE_DIR, fname)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        # Se eliminan primero los menos usados, conservando siempre el más reciente
+        for _, size, path in sorted(files)[:-1]:
+            if total <= budget:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,141 @@
+import time
+
+import pandas as pd
+
+from app.inferencia_tipos import inferir_tipos
+from app.compactacion import reducir_numerica, es_baja_cardinalidad, a_categoria, concatenar_columna
+
+
+# =====================================================
+# INGESTA DE CSV POR BLOQUES CON TECHO DE MEMORIA
+# =====================================================
+# El primer bloque fija el esquema (numérica / binaria / categórica / texto) y
+# cada bloque siguiente se convierte y compacta antes de acumularse, así nunca
+# coexisten en memoria el CSV completo con tipos por defecto y su versión limpia.
+
+FILAS_PRIMER_BLOQUE = 50_000
+FRACCION_BLOQUE = 0.1   # cada bloque crudo usa como máximo esta fracción del presupuesto
+
+
+class PresupuestoExcedido(MemoryError):
+    pass
+
+
+def _plan_columnas(bloque, reporte):
+    plan = {}
+    for fila in reporte.to_dict("records"):
+        col = fila["Column"]
+        accion = fila["Action"]
+        if accion == "to numeric":
+            plan[col] = "numeric"
+        elif accion in ("binary to categorical", "to numeric → binary"):
+            plan[col] = "binary"
+        elif pd.api.types.is_numeric_dtype(bloque[col]):
+            plan[col] = "numeric"
+        elif es_baja_cardinalidad(bloque[col]):
+            plan[col] = "category"
+        else:
+            plan[col] = "text"
+    return plan
+
+
+def _aplicar_plan(bloque, plan):
+    for col, tipo in plan.items():
+        serie = bloque[col]
+        if tipo == "numeric":
+            bloque[col] = reducir_numerica(pd.to_numeric(serie, errors="coerce"))
+        elif tipo == "binary":
+            # Valores fuera de {0, 1} en bloques posteriores se conservan como texto
+            numerica = pd.to_numeric(serie, errors="coerce")
+            mapeada = numerica.map({0: "No", 1: "Yes"})
+            fuera = mapeada.isna() & serie.notna()
+            if fuera.any():
+                mapeada = mapeada.astype(object)
+                mapeada[fuera] = serie[fuera].astype(str)
+            bloque[col] = a_categoria(mapeada)
+        elif tipo in ("category", "text"):
+            # Un bloque posterior puede leerse como numérico: se fuerza a texto para no mezclar tipos
+            if serie.dtype != object:
+                serie = serie.astype(object).where(serie.isna(), serie.astype(str))
+            bloque[col] = a_categoria(serie) if tipo == "category" else serie
+    return bloque
+
+
+def _memoria(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _columnas(bloque):
+    # Cada columna por separado (tras _aplicar_plan cada una es su propio bloque de
+    # pandas), para poder liberarlas una a una al concatenar
+    return {col: bloque[col] for col in bloque.columns}
+
+
+def _unir_columnas(bloques, orden):
+    """Concatena columna a columna liberando los trozos ya copiados: el pico es el total más una columna."""
+    columnas = {}
+    for col in orden:
+        partes = [b.pop(col) for b in bloques]
+        columnas[col] = concatenar_columna(partes)
+        del partes
+    return pd.DataFrame(columnas, copy=False)
+
+
+def leer_csv_por_bloques(archivo, presupuesto_mb=1024, on_progress=None):
+    """
+    Lee un CSV por bloques y devuelve (DataFrame compacto, reporte de tipos).
+    Lanza PresupuestoExcedido si el pico de memoria (bloques acumulados más la
+    mayor columna mientras se une) no cabe en `presupuesto_mb`.
+    """
+    presupuesto = int(presupuesto_mb * 1024 * 1024)
+    total_bytes = getattr(archivo, "size", None)
+    inicio = time.perf_counter()
+
+    lector = pd.read_csv(archivo, iterator=True)
+    primero = lector.get_chunk(FILAS_PRIMER_BLOQUE)
+    bytes_por_fila = max(1, _memoria(primero) // max(1, len(primero)))
+    filas_bloque = max(1_000, int(presupuesto * FRACCION_BLOQUE / bytes_por_fila))
+
+    # El esquema se decide con el primer bloque y queda fijo para el resto
+    _, reporte = inferir_tipos(primero.copy())
+    plan = _plan_columnas(primero, reporte)
+
+    primero = _aplicar_plan(primero, plan)
+    orden = list(primero.columns)
+    # Bytes acumulados por columna: al unir, la columna en curso coexiste con sus trozos
+    por_columna = primero.memory_usage(deep=True, index=False).to_dict()
+    usados = _memoria(primero)
+    bloques = [_columnas(primero)]
+    filas = len(primero)
+    del primero
+
+    def progreso():
+        if on_progress is not None:
+            leidos = archivo.tell() if hasattr(archivo, "tell") else None
+            segundos = max(time.perf_counter() - inicio, 1e-9)
+            on_progress(filas, leidos, total_bytes, filas / segundos)
+
+    progreso()
+    while True:
+        try:
+            bloque = lector.get_chunk(filas_bloque)
+        except StopIteration:
+            break
+        bloque = _aplicar_plan(bloque, plan)
+        usados += _memoria(bloque)
+        for col, n in bloque.memory_usage(deep=True, index=False).items():
+            por_columna[col] += n
+        if usados + max(por_columna.values(), default=0) > presupuesto:
+            lector.close()
+            raise PresupuestoExcedido(
+                f"Dataset exceeds the memory budget of {presupuesto_mb:,.0f} MB "
+                f"after {filas:,} rows."
+            )
+        filas += len(bloque)
+        bloques.append(_columnas(bloque))
+        del bloque
+        progreso()
+
+    df = _unir_columnas(bloques, orden)
+    reporte["Streamed as"] = reporte["Column"].map(plan)
+    return df, reporte
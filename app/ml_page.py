@@ -1,12 +1,131 @@
 import streamlit as st
 import os
+import time
 import pandas as pd
-import joblib
 from app.utils import apply_style
+from app.model_registry import models_dir, list_bundles, get_registry
+from app.model_metadata import input_schema, range_label, validate_input
+from app.scoring import compare_models, POSITIVE_LABEL
+from app.prediction_cache import score_cached, get_cache
+from app import alloc_profiler
+from app.batch_scoring import DEFAULT_CHUNK_ROWS, stage_upload, start_job, get_job
+
+MAX_DOWNLOAD_MB = 200
 
 apply_style()
 
-def prediction_page(df_clean):
+
+# ----------------------------------------------------------
+# BATCH SCORING
+# ----------------------------------------------------------
+def _progreso_lote(job):
+    barra = st.progress(0.0)
+    estado = st.empty()
+
+    def pintar():
+        total = f"{job.rows_total:,}" if job.rows_total else "?"
+        barra.progress(
+            job.progress,
+            text=f"{job.rows_done:,} / {total} rows · {job.rows_per_sec:,.0f} rows/sec · {job.elapsed:.1f}s"
+        )
+
+    if job.running and st.button("⏹️ Cancel", key="batch_cancel"):
+        job.cancel()
+    # El hilo puntúa en segundo plano; aquí solo se refresca el progreso
+    while job.running:
+        pintar()
+        time.sleep(0.3)
+    pintar()
+
+    if job.status == "done":
+        estado.success(f"✅ Scored {job.rows_done:,} rows with {job.bundle_name} in {job.elapsed:.1f}s.")
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Rows scored", f"{job.rows_done:,}")
+        m2.metric("Predicted churn", f"{job.positives / max(job.rows_done, 1):.2%}")
+        m3.metric("Throughput", f"{job.rows_per_sec:,.0f} rows/s")
+        m4.metric("From cache", f"{job.cache_hits / max(job.rows_done, 1):.1%}")
+        size_mb = os.path.getsize(job.output_path) / 2**20
+        if size_mb <= MAX_DOWNLOAD_MB:
+            with open(job.output_path, "rb") as f:
+                st.download_button(
+                    "💾 Download scored file (CSV)", data=f, file_name=f"scored_{job.bundle_name}.csv",
+                    mime="text/csv", key="batch_download"
+                )
+        st.caption(f"Output written on the server: `{job.output_path}` ({size_mb:,.1f} MB)")
+    elif job.status == "cancelled":
+        estado.warning(f"⏹️ Cancelled after {job.rows_done:,} rows.")
+    elif job.status == "failed":
+        estado.error(f"❌ Batch scoring failed: {job.error}")
+
+
+def batch_scoring_panel(bundle, bundle_name):
+    st.markdown("### 📦 Batch Scoring")
+    st.caption(
+        "Score a customer file with the same columns as the training data. The file is processed in "
+        "fixed-size chunks on a background thread and each scored chunk is appended to the output CSV."
+    )
+
+    archivo = st.file_uploader("Customer file (CSV or Parquet):", type=["csv", "parquet"], key="batch_file")
+
+    c1, c2 = st.columns(2)
+    chunk_rows = c1.number_input(
+        "Chunk size (rows):", min_value=1_000, max_value=1_000_000,
+        value=DEFAULT_CHUNK_ROWS, step=10_000, key="batch_chunk"
+    )
+    keep_inputs = c2.checkbox("Include input columns in the output", value=False, key="batch_keep_inputs")
+    use_cache = c2.checkbox(
+        "Reuse cached predictions", value=True, key="batch_use_cache",
+        help="Customers already scored with this model (form, API or earlier files) are not rescored."
+    )
+
+    job = get_job(st.session_state.get("batch_job_id"))
+    if st.button("🚀 Start batch scoring", disabled=job is not None and job.running, key="batch_start"):
+        if archivo is None:
+            st.warning("⚠️ Upload a file first.")
+        else:
+            # La copia subida pertenece al trabajo: se borra al terminar
+            job = start_job(bundle, bundle_name, stage_upload(archivo), chunk_rows, keep_inputs, use_cache,
+                            owns_source=True)
+            st.session_state.batch_job_id = job.id
+
+    if job is not None:
+        _progreso_lote(job)
+
+
+def _schema_from_frame(df, features):
+    # Respaldo para bundles sin esquema de entrada: se deduce del dataset de la sesión
+    schema = {}
+    for col in features:
+        if df is None or col not in df.columns:
+            continue
+        serie = df[col]
+        if pd.api.types.is_numeric_dtype(serie):
+            schema[col] = {
+                "kind": "numeric",
+                "dtype": "int" if pd.api.types.is_integer_dtype(serie) else "float",
+                "median": float(serie.median()),
+            }
+        else:
+            schema[col] = {"kind": "categorical", "categories": sorted(str(x) for x in serie.dropna().unique())}
+    return schema
+
+
+def _input_widget(col_name, spec):
+    # Un widget por variable a partir del esquema: O(variables), sin recorrer el dataset
+    if spec["kind"] == "numeric":
+        rango = f"{range_label(spec).capitalize()}: {spec['min']:g} – {spec['max']:g}" if "min" in spec else None
+        if spec.get("dtype") == "int":
+            return st.number_input(f"**{col_name}**", value=int(round(spec["median"])), step=1, format="%d", help=rango)
+        return st.number_input(f"**{col_name}**", value=float(spec["median"]), help=rango)
+    options = [x for x in spec.get("categories", []) if x != ""]
+    if len(options) == 0:
+        return ""
+    if len(options) == 2:
+        return st.radio(f"**{col_name}**", options, horizontal=True)
+    return st.selectbox(f"**{col_name}**", options)
+
+
+def prediction_page(df_clean=None):
     st.markdown(
         """
         <div style='text-align:center; padding: 1.5em 0;'>
@@ -25,11 +144,8 @@ def prediction_page(df_clean):
     # ----------------------------------------------------------
     # LOAD MODELS
     # ----------------------------------------------------------
-    model_dir = os.path.join(os.path.dirname(__file__), "..", "models")
-    available_models = [
-        f for f in os.listdir(model_dir)
-        if f.endswith(".pkl") and not f.startswith("model_metrics")
-    ]
+    model_dir = models_dir()
+    available_models = list_bundles()
 
     if not available_models:
         st.error("❌ No trained models found in the `models/` directory.")
@@ -54,12 +170,37 @@ def prediction_page(df_clean):
         return
 
     try:
-        bundle = joblib.load(model_path)
-        pipe = bundle["pipeline"]
-        raw_features = bundle.get("raw_features", list(df_clean.columns))
+        bundle = get_registry().get(model_path)
         target_name = bundle.get("target_name", "Churn")
+        # Esquema de entrada guardado en el sidecar; sin él, se deduce del dataset de la sesión
+        schema = input_schema(model_choice, version_choice) or _schema_from_frame(
+            df_clean, bundle.get("raw_features", [])
+        )
 
         st.sidebar.success(f"✅ Loaded: {model_choice.upper()} ({version_choice.upper()})")
+        with st.sidebar.expander("🗂️ Model cache"):
+            st.dataframe(pd.DataFrame(get_registry().stats()), use_container_width=True)
+            # Perfilado de asignaciones: solo lectura. Lo activa el administrador con
+            # CHURN_PROFILE_ALLOC=1 porque tracemalloc afecta a todo el proceso
+            if alloc_profiler.is_enabled():
+                st.caption(
+                    "Allocation profile (process-wide: aggregates every session and thread, "
+                    "not just this request)"
+                )
+                if alloc_profiler.stats():
+                    st.dataframe(pd.DataFrame(alloc_profiler.stats()), use_container_width=True)
+        with st.sidebar.expander("🧠 Prediction cache"):
+            # Caché compartida por sesiones, lotes y API: (bundle, fila) → probabilidad
+            cache = get_cache().stats()
+            p1, p2 = st.columns(2)
+            p1.metric("Hit rate", f"{cache['hit_rate']:.1%}")
+            p2.metric("Entries", f"{cache['entries']:,}")
+            st.caption(
+                f"{cache['hits']:,} hits · {cache['misses']:,} misses · {cache['evictions']:,} evictions "
+                f"(max {cache['max_entries']:,})"
+            )
+            if st.button("Clear cache", key="clear_prediction_cache"):
+                get_cache().clear()
 
     except Exception as e:
         st.error(f"Error loading model: {e}")
@@ -67,6 +208,33 @@ def prediction_page(df_clean):
 
     st.markdown("---")
 
+    modo = st.radio(
+        "Scoring mode:", ["Single customer", "Compare all models", "Batch file"], horizontal=True, key="scoring_mode"
+    )
+    if modo == "Batch file":
+        batch_scoring_panel(bundle, f"{model_choice}_{version_choice}")
+        return
+
+    comparar = modo == "Compare all models"
+    if comparar:
+        # Todos los bundles disponibles; el formulario pide la unión de sus variables
+        bundles, form_schema = {}, {}
+        for f in available_models:
+            b = get_registry().get(os.path.join(model_dir, f))
+            if b is not None:
+                bundles[f[:-4]] = b
+                mdl, version = f[:-4].rsplit("_", 1)
+                for col, spec in (input_schema(mdl, version) or _schema_from_frame(
+                    df_clean, b.get("raw_features", [])
+                )).items():
+                    form_schema.setdefault(col, spec)
+    else:
+        form_schema = schema
+
+    if not form_schema:
+        st.error("⚠️ This model has no stored input schema. Prepare a dataset in EDA first to build the form.")
+        return
+
     # ----------------------------------------------------------
     # FORM SECTION (Glass Card)
     # ----------------------------------------------------------
@@ -93,29 +261,11 @@ def prediction_page(df_clean):
     with st.form("prediction_form"):
         cols = st.columns(2)
         i = 0
-        for col_name in raw_features:
-            if col_name == target_name or col_name not in df_clean.columns:
+        for col_name, spec in form_schema.items():
+            if col_name == target_name:
                 continue
-
-            serie = df_clean[col_name]
             with cols[i % 2]:
-                if pd.api.types.is_numeric_dtype(serie):
-                    if pd.api.types.is_integer_dtype(serie):
-                        user_input[col_name] = st.number_input(
-                            f"**{col_name}**", value=int(serie.median()), step=1, format="%d"
-                        )
-                    else:
-                        user_input[col_name] = st.number_input(
-                            f"**{col_name}**", value=float(serie.median())
-                        )
-                else:
-                    options = sorted([x for x in serie.dropna().unique().tolist() if x != ""])
-                    if len(options) == 0:
-                        user_input[col_name] = ""
-                    elif len(options) == 2:
-                        user_input[col_name] = st.radio(f"**{col_name}**", options, horizontal=True)
-                    else:
-                        user_input[col_name] = st.selectbox(f"**{col_name}**", options)
+                user_input[col_name] = _input_widget(col_name, spec)
             i += 1
 
         st.markdown("<br>", unsafe_allow_html=True)
@@ -125,14 +275,62 @@ def prediction_page(df_clean):
     # PREDICTION RESULT
     # ----------------------------------------------------------
     if submitted:
+        # Validación contra el esquema antes de puntuar: errores bloquean, avisos solo informan
+        errores, avisos = validate_input(form_schema, user_input)
+        for aviso in avisos:
+            st.warning(f"⚠️ {aviso}")
+        if errores:
+            st.error("❌ Invalid input:\n\n" + "\n".join(f"- {e}" for e in errores))
+            submitted = False
+
+    if submitted and comparar:
         try:
-            input_df = pd.DataFrame([user_input])
-            pred = pipe.predict(input_df)[0]
-            proba = (
-                pipe.predict_proba(input_df)[0][1]
-                if hasattr(pipe, "predict_proba")
-                else None
+            t0 = time.perf_counter()
+            resultados, tiempos = compare_models(bundles, user_input)
+            total_ms = (time.perf_counter() - t0) * 1000
+            tabla = pd.DataFrame([
+                {
+                    "Model": nombre.rsplit("_", 1)[0].upper(),
+                    "Version": nombre.rsplit("_", 1)[1].upper(),
+                    "Churn Probability": r.probability,
+                    "Prediction": r.label,
+                    "Threshold": r.threshold,
+                    "Transform (ms)": tiempos[nombre]["transform_ms"],
+                    "Predict (ms)": tiempos[nombre]["predict_ms"],
+                }
+                for nombre, r in resultados.items()
+            ]).sort_values("Churn Probability", ascending=False)
+
+            st.markdown("---")
+            st.markdown(
+                """
+                <h3 style='color:#00e676; text-align:center;'>
+                    ⚖️ Model Comparison
+                </h3>
+                """,
+                unsafe_allow_html=True
             )
+            st.dataframe(
+                tabla.style.format({
+                    "Churn Probability": "{:.2%}", "Threshold": "{:.0%}",
+                    "Transform (ms)": "{:.2f}", "Predict (ms)": "{:.2f}",
+                }),
+                use_container_width=True, hide_index=True
+            )
+            n_prep = len({t["preprocessor"] for t in tiempos.values()})
+            secuencial = sum(t["transform_ms"] / (t["shared_with"] + 1) + t["predict_ms"] for t in tiempos.values())
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Models scored", len(resultados))
+            c2.metric("Distinct preprocessors", n_prep)
+            c3.metric("Wall time", f"{total_ms:.1f} ms", delta=f"{secuencial:.1f} ms summed", delta_color="off")
+        except Exception as e:
+            st.error(f"Error during comparison: {e}")
+
+    elif submitted:
+        try:
+            # Un solo preprocesado (compilado para una fila), o la probabilidad ya calculada para este perfil
+            resultado = score_cached(bundle, user_input)
+            pred, proba = resultado.label, resultado.probability
 
             st.markdown("---")
             st.markdown(
@@ -147,7 +345,7 @@ def prediction_page(df_clean):
             col1, col2 = st.columns([2, 1])
 
             with col1:
-                if str(pred) == "Yes":
+                if pred == POSITIVE_LABEL:
                     st.markdown(
                         """
                         <div style='
@@ -181,23 +379,22 @@ def prediction_page(df_clean):
                     )
 
             with col2:
-                if proba is not None:
-                    st.metric("Churn Probability", f"{proba * 100:.2f}%", delta=None)
+                st.metric("Churn Probability", f"{proba * 100:.2f}%", delta=None)
+                st.caption(f"Decision threshold: {resultado.threshold:.0%}")
 
             # Recommendations
-            if proba is not None:
-                if proba > 0.7:
-                    st.warning(
-                        "⚠️ **High risk of churn detected.**\n\n💡 Suggested action: Offer a discount or loyalty incentive."
-                    )
-                elif proba > 0.4:
-                    st.info(
-                        "🟡 **Medium churn risk.**\n\nConsider sending satisfaction surveys or retention offers."
-                    )
-                else:
-                    st.success(
-                        "🟢 **Low churn risk.** Customer likely to remain loyal."
-                    )
+            if proba > 0.7:
+                st.warning(
+                    "⚠️ **High risk of churn detected.**\n\n💡 Suggested action: Offer a discount or loyalty incentive."
+                )
+            elif proba > 0.4:
+                st.info(
+                    "🟡 **Medium churn risk.**\n\nConsider sending satisfaction surveys or retention offers."
+                )
+            else:
+                st.success(
+                    "🟢 **Low churn risk.** Customer likely to remain loyal."
+                )
 
             st.markdown(
                 f"""
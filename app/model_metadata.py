@@ -0,0 +1,188 @@
+import os
+import json
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.model_registry import bundle_path, list_bundles, models_dir, get_registry
+
+
+# =====================================================
+# SIDECARS DE METADATOS ({model}_{version}.meta.json)
+# =====================================================
+# Los gráficos del Dashboard y de Business Impact solo necesitan métricas,
+# matriz de confusión e importancias. Se guardan en un JSON pequeño junto a cada
+# bundle para no tener que deserializar el modelo completo.
+
+SCHEMA_VERSION = 3
+# Dataset de referencia para completar tipo y rango de los bundles exportados sin `input_ranges_`.
+# Incluye también las filas de test, así que esos rangos se etiquetan como "reference", no "training".
+REFERENCE_DATASET = os.path.abspath(os.path.join(models_dir(), "..", "cleaned_dataset.csv"))
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def sidecar_path(pkl_path):
+    return os.path.splitext(pkl_path)[0] + ".meta.json"
+
+
+def _to_builtin(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _backfill_schema(schema, reference=REFERENCE_DATASET):
+    """Añade dtype/min/max a las numéricas que no los traen, leyendo solo esas columnas del dataset de referencia."""
+    faltan = [c for c, s in schema.items() if s.get("kind") == "numeric" and "min" not in s]
+    if not faltan or not os.path.exists(reference):
+        return schema
+    cols = [c for c in pd.read_csv(reference, nrows=0).columns if c in faltan]
+    ref = pd.read_csv(reference, usecols=cols)
+    for col in cols:
+        serie = pd.to_numeric(ref[col], errors="coerce")
+        schema[col].update({
+            "dtype": "int" if pd.api.types.is_integer_dtype(ref[col]) else "float",
+            "min": float(serie.min()),
+            "max": float(serie.max()),
+            "range_source": "reference",
+        })
+    return schema
+
+
+def range_label(spec):
+    # Origen del rango de una numérica: split de entrenamiento (fit) o dataset limpio completo
+    if spec.get("range_source") == "reference":
+        return f"reference range ({os.path.basename(REFERENCE_DATASET)}, all rows)"
+    return "training range"
+
+
+def build_metadata(bundle):
+    pipe = bundle["pipeline"]
+    pre = pipe.named_steps.get("preprocessing") if hasattr(pipe, "named_steps") else None
+
+    output_features = list(pre._columns) if pre is not None and getattr(pre, "_columns", None) else []
+    selected = bundle.get("selected_features", None)
+    importances = list(bundle.get("feature_importances", []) or [])
+
+    # Nombres alineados con las importancias: 'top' usa selected_features, 'all' las columnas del preparer
+    if selected:
+        importance_features = list(selected)
+    elif len(output_features) == len(importances):
+        importance_features = output_features
+    else:
+        importance_features = [f"F{i}" for i, _ in enumerate(importances)]
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "target_name": bundle.get("target_name", "Churn"),
+        "raw_features": list(bundle.get("raw_features", [])),
+        "raw_schema": _backfill_schema(pre.input_schema()) if hasattr(pre, "input_schema") else {},
+        "output_features": output_features,
+        "selected_features": list(selected) if selected else None,
+        "metrics_val": dict(bundle.get("metrics_val", {}) or {}),
+        "confusion_val": bundle.get("confusion_val", None),
+        "feature_importances": importances,
+        "importance_features": importance_features,
+    }
+
+
+def write_sidecar(bundle, pkl_path):
+    path = sidecar_path(pkl_path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(build_metadata(bundle), f, default=_to_builtin, indent=1)
+    return path
+
+
+def load_metadata(model_name: str, version: str):
+    pkl = bundle_path(model_name, version)
+    meta_path = sidecar_path(pkl)
+
+    if not os.path.exists(meta_path):
+        # Sin sidecar: se genera una vez a partir del bundle (caso de bundles antiguos)
+        return _regenerate(pkl)
+
+    mtime = os.stat(meta_path).st_mtime_ns
+    with _lock:
+        cached = _cache.get(meta_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("schema_version", 1) < SCHEMA_VERSION:
+        # Sidecar de un formato anterior (esquema sin tipos ni rangos): se reescribe
+        return _regenerate(pkl) or meta
+    with _lock:
+        _cache[meta_path] = (mtime, meta)
+    return meta
+
+
+def _regenerate(pkl):
+    bundle = get_registry().get(pkl)
+    if bundle is None:
+        return None
+    try:
+        write_sidecar(bundle, pkl)
+    except OSError:
+        return build_metadata(bundle)
+    return load_metadata(*os.path.basename(pkl)[:-4].rsplit("_", 1))
+
+
+def input_schema(model_name: str, version: str):
+    meta = load_metadata(model_name, version)
+    return (meta or {}).get("raw_schema") or {}
+
+
+def validate_input(schema, row):
+    """
+    Comprueba una fila contra el esquema de entrada. Devuelve (errores, avisos):
+    categóricas faltantes o desconocidas y numéricas no convertibles o no finitas
+    (inf, nan en texto) son errores; numéricas faltantes (se imputan con la
+    mediana) o fuera del rango registrado solo son avisos.
+    """
+    errors, warnings = [], []
+    for col, spec in schema.items():
+        value = row.get(col)
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            if spec.get("kind") == "numeric":
+                warnings.append(f"{col}: missing, imputed with the training median ({spec.get('median', 0):g})")
+            else:
+                errors.append(f"{col}: missing value")
+        elif spec.get("kind") == "numeric":
+            try:
+                x = float(value)
+            except (TypeError, ValueError):
+                errors.append(f"{col}: expected a number, got {value!r}")
+                continue
+            if not math.isfinite(x):
+                errors.append(f"{col}: expected a finite number, got {value!r}")
+            elif spec.get("dtype") == "int" and not x.is_integer():
+                errors.append(f"{col}: expected an integer, got {value!r}")
+            elif "min" in spec and not spec["min"] <= x <= spec["max"]:
+                warnings.append(f"{col}={value} is outside the {range_label(spec)} [{spec['min']:g}, {spec['max']:g}]")
+        elif spec.get("kind") == "categorical" and str(value) not in spec.get("categories", []):
+            errors.append(f"{col}: unknown category {value!r} (allowed: {', '.join(spec.get('categories', []))})")
+    return errors, warnings
+
+
+def importances_frame(meta, top=30):
+    importances = meta.get("feature_importances") or []
+    if not importances:
+        return None
+    return (
+        pd.DataFrame({"feature": meta["importance_features"], "importance": importances})
+        .sort_values("importance", ascending=False)
+        .head(top)
+    )
+
+
+# Regenera los sidecars de todos los bundles: python -m app.model_metadata
+if __name__ == "__main__":
+    for fname in list_bundles():
+        pkl = os.path.join(models_dir(), fname)
+        print("Saved:", write_sidecar(get_registry().get(pkl), pkl))
@@ -0,0 +1,203 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+from app.pipelines_transf import prepare_for_inference
+from app.tree_engine import attach_tree_engine
+
+
+# =====================================================
+# REGISTRO DE MODELOS (compartido por todo el proceso)
+# =====================================================
+# Streamlit importa los módulos una sola vez por proceso, así que este registro
+# es compartido por todas las sesiones: cada bundle se deserializa una vez y se
+# reutiliza en cada rerun. Al cargar, el registro decora el bundle una sola vez
+# (pipeline de inferencia, motor de árboles, sha256); quien lo recibe no debe
+# modificarlo, porque la misma instancia la comparten todas las sesiones.
+
+DEFAULT_BUDGET_MB = float(os.environ.get("CHURN_MODEL_CACHE_MB", 1024))
+
+
+def models_dir():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
+
+
+def bundle_path(model_name: str, version: str):
+    return os.path.join(models_dir(), f"{model_name.lower()}_{version.lower()}.pkl")
+
+
+def list_bundles():
+    md = models_dir()
+    if not os.path.isdir(md):
+        return []
+    return sorted([f for f in os.listdir(md) if f.endswith(".pkl") and not f.startswith("model_metrics")])
+
+
+def _file_hash(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _array_bytes(obj):
+    # Suma `nbytes` de los arrays de numpy alcanzables desde obj, sin serializar ni
+    # copiar nada. Los árboles de sklearn (Tree, extensión Cython) exponen sus nodos
+    # solo a través de __getstate__, que devuelve vistas sobre su propia memoria.
+    total, seen, stack = 0, set(), [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, (str, bytes, int, float, bool, type(None))):
+            continue
+        seen.add(id(o))
+        if isinstance(o, np.ndarray):
+            total += o.nbytes
+        elif isinstance(o, dict):
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif type(o).__module__ == "sklearn.tree._tree" and hasattr(o, "__getstate__"):
+            stack.append(o.__getstate__())
+        elif hasattr(o, "__dict__"):
+            stack.extend(vars(o).values())
+    return total
+
+
+def _estimate_size(bundle, file_size):
+    # Memoria residente aproximada para el presupuesto del LRU. Los modelos opacos
+    # (p.ej. CatBoost, memoria en C++) no exponen arrays: el tamaño del archivo es
+    # la cota inferior, así ningún bundle cuenta como 0 bytes.
+    return max(_array_bytes(bundle), file_size, 1)
+
+
+class _Entry:
+    __slots__ = ("bundle", "mtime_ns", "file_size", "sha256", "size_bytes", "load_seconds", "hits", "loaded_at")
+
+    def __init__(self, bundle, mtime_ns, file_size, sha256, size_bytes, load_seconds):
+        self.bundle = bundle
+        self.mtime_ns = mtime_ns
+        self.file_size = file_size
+        self.sha256 = sha256
+        self.size_bytes = size_bytes
+        self.load_seconds = load_seconds
+        self.hits = 0
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    """
+    Caché LRU de bundles `.pkl` con presupuesto de memoria.
+    Invalida una entrada cuando cambia el mtime/tamaño del archivo y el hash del
+    contenido ya no coincide.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        # Un lock por ruta para que dos sesiones no deserialicen el mismo archivo a la vez
+        self._path_locks = {}
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def _path_lock(self, path):
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            return None
+
+        with self._path_lock(path):
+            st = os.stat(path)
+            with self._lock:
+                entry = self._entries.get(path)
+            if entry is not None:
+                if (entry.mtime_ns, entry.file_size) != (st.st_mtime_ns, st.st_size):
+                    # El archivo fue tocado: solo se recarga si el contenido cambió
+                    if _file_hash(path) == entry.sha256:
+                        entry.mtime_ns, entry.file_size = st.st_mtime_ns, st.st_size
+                    else:
+                        entry = None
+                if entry is not None:
+                    with self._lock:
+                        entry.hits += 1
+                        self.hits += 1
+                        self._entries.move_to_end(path)
+                    return entry.bundle
+
+            entry = self._load(path, st)
+            with self._lock:
+                self._entries[path] = entry
+                self._entries.move_to_end(path)
+                self.loads += 1
+                self._evict()
+            return entry.bundle
+
+    def _load(self, path, st):
+        t0 = time.perf_counter()
+        bundle = joblib.load(path)
+        # Enlaza ColumnFilter por nombre y poda el preprocesado de los bundles "top"
+        prepare_for_inference(bundle)
+        # Árboles y bosques: forma aplanada para predecir sin el bucle por estimador de sklearn
+        attach_tree_engine(bundle)
+        load_seconds = time.perf_counter() - t0
+        # Huella del archivo dentro del bundle: clave de la caché de predicciones
+        bundle["sha256"] = _file_hash(path)
+        return _Entry(
+            bundle=bundle,
+            mtime_ns=st.st_mtime_ns,
+            file_size=st.st_size,
+            sha256=bundle["sha256"],
+            size_bytes=_estimate_size(bundle, st.st_size),
+            load_seconds=load_seconds,
+        )
+
+    def _evict(self):
+        # Siempre se conserva la entrada más reciente aunque exceda el presupuesto
+        total = sum(e.size_bytes for e in self._entries.values())
+        while total > self.budget_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            total -= old.size_bytes
+            self.evictions += 1
+
+    def bundle_hash(self, path):
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(path))
+        return entry.sha256 if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return [
+                {
+                    "bundle": os.path.basename(path),
+                    "load_ms": round(e.load_seconds * 1000, 1),
+                    "size_mb": round(e.size_bytes / (1024 * 1024), 2),
+                    "hits": e.hits,
+                    "sha256": e.sha256[:12],
+                }
+                for path, e in self._entries.items()
+            ]
+
+
+_REGISTRY = ModelRegistry()
+
+
+def get_registry():
+    return _REGISTRY
+
+
+def load_bundle(model_name: str, version: str):
+    return _REGISTRY.get(bundle_path(model_name, version))
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from app.versiones_dataset import hash_operacion
+
+
+# =====================================================
+# MODO MUESTRA (muestra estratificada por el target)
+# =====================================================
+# Con datasets muy grandes los gráficos interactivos trabajan sobre una muestra
+# estratificada: cada clase del target conserva su proporción exacta (salvo
+# redondeo) y el resto de variables llevan un margen de error conocido. La
+# muestra se cachea por (versión, target, tamaño) y tiene su propia versión,
+# así que los cachés de perfiles, correlaciones y figuras funcionan igual.
+
+TAMANO_MUESTRA = 100_000
+UMBRAL_MUESTRA = 1_000_000
+MAX_MUESTRAS = 8
+Z_95 = 1.96
+
+
+class Muestra:
+    __slots__ = ("df", "version", "total", "target")
+
+    def __init__(self, df, version, total, target):
+        self.df = df
+        self.version = version
+        self.total = total
+        self.target = target
+
+    @property
+    def n(self):
+        return len(self.df)
+
+    @property
+    def fraccion(self):
+        return self.n / self.total if self.total else 1.0
+
+    def resumen(self):
+        estratos = f", stratified on `{self.target}`" if self.target else ""
+        return (
+            f"🧪 Sample mode: {self.n:,} of {self.total:,} rows ({self.fraccion:.2%}){estratos} · "
+            f"shares within ±{self.margen_maximo():.2f} pp (95%)"
+        )
+
+    def margen_maximo(self):
+        """Margen de error al 95% (en puntos porcentuales) del peor caso p = 0.5."""
+        return float(margen_error(0.5, self.n, self.total)) * 100
+
+
+def correccion_finita(n, total):
+    return np.sqrt(np.clip((total - n) / max(total - 1, 1), 0.0, 1.0))
+
+
+def margen_error(p, n, total, z=Z_95):
+    """Semiancho del intervalo al 95% de una proporción estimada con n de `total` filas."""
+    p = np.asarray(p, dtype=float)
+    n = np.asarray(n, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margen = z * np.sqrt(p * (1 - p) / n) * correccion_finita(n, total)
+    return np.where(n > 0, margen, np.nan)
+
+
+def indices_estratificados(estratos, n, semilla=0):
+    """Posiciones (ordenadas) de una muestra de tamaño n con asignación proporcional por estrato."""
+    codigos, _ = pd.factorize(estratos, use_na_sentinel=False)
+    total = len(codigos)
+    if n >= total:
+        return np.arange(total)
+    tamanos = np.bincount(codigos)
+    # Asignación proporcional; los restos se reparten por mayor parte fraccionaria
+    cuota = tamanos * n / total
+    asignado = np.floor(cuota).astype(np.int64)
+    faltan = n - asignado.sum()
+    asignado[np.argsort(-(cuota - asignado), kind="stable")[:faltan]] += 1
+    # Ninguna clase presente desaparece de la muestra
+    asignado = np.minimum(np.maximum(asignado, 1), tamanos)
+
+    rng = np.random.default_rng(semilla)
+    orden = np.lexsort((rng.random(total), codigos))
+    inicio = np.concatenate(([0], np.cumsum(tamanos)[:-1]))
+    rango = np.arange(total) - inicio[codigos[orden]]
+    return np.sort(orden[rango < asignado[codigos[orden]]])
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def muestra_estratificada(df, target_col, n=TAMANO_MUESTRA, version=None, semilla=0):
+    clave = (version, target_col, n, semilla)
+    if version is not None:
+        with _lock:
+            if clave in _cache:
+                _cache.move_to_end(clave)
+                return _cache[clave]
+    if target_col is not None and target_col in df.columns:
+        idx = indices_estratificados(df[target_col], n, semilla)
+    else:
+        idx = np.sort(np.random.default_rng(semilla).permutation(len(df))[:n])
+    version_muestra = hash_operacion(version, ("sample", target_col, n, semilla)) if version else None
+    muestra = Muestra(df.iloc[idx], version_muestra, len(df), target_col)
+    if version is not None:
+        with _lock:
+            _cache[clave] = muestra
+            while len(_cache) > MAX_MUESTRAS:
+                _cache.popitem(last=False)
+    return muestra
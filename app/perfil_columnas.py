@@ -0,0 +1,258 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# =====================================================
+# PERFILES DE COLUMNA CON SKETCHES COMBINABLES
+# =====================================================
+# Cada columna guarda conteos, nulos, min/max/media/varianza, un sketch de
+# cuantiles, una estimación de valores distintos (HyperLogLog) y los valores más
+# frecuentes. Todos se pueden combinar (merge), así que el perfil se construye
+# por bloques y una sola vez por versión del dataset; después los paneles de
+# KPIs y estadísticas son O(columnas) en lugar de O(filas).
+
+TAMANO_BLOQUE = 250_000
+K_CUANTILES = 2048
+P_HLL = 12
+TOP_K = 20
+CAPACIDAD_TOP = TOP_K * 10
+MAX_PERFILES = 32
+
+
+class SketchCuantiles:
+    """Sketch tipo KLL simplificado: niveles con peso 2**nivel que se compactan a la mitad."""
+
+    def __init__(self, k=K_CUANTILES, semilla=0):
+        self.k = k
+        self.niveles = [np.empty(0)]
+        self._rng = np.random.default_rng(semilla)
+
+    def agregar(self, valores):
+        valores = np.asarray(valores, dtype=float)
+        self.niveles[0] = np.concatenate([self.niveles[0], valores[~np.isnan(valores)]])
+        self._compactar()
+
+    def combinar(self, otro):
+        for i, nivel in enumerate(otro.niveles):
+            if i >= len(self.niveles):
+                self.niveles.append(np.empty(0))
+            self.niveles[i] = np.concatenate([self.niveles[i], nivel])
+        self._compactar()
+
+    def _compactar(self):
+        i = 0
+        while i < len(self.niveles):
+            if len(self.niveles[i]) > self.k:
+                nivel = np.sort(self.niveles[i])
+                if len(nivel) % 2:
+                    # El elemento sobrante se queda en su nivel
+                    resto, nivel = nivel[-1:], nivel[:-1]
+                else:
+                    resto = np.empty(0)
+                promovidos = nivel[self._rng.integers(0, 2)::2]
+                self.niveles[i] = resto
+                if i + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0))
+                self.niveles[i + 1] = np.concatenate([self.niveles[i + 1], promovidos])
+            i += 1
+
+    def cuantiles(self, qs):
+        valores = np.concatenate(self.niveles)
+        if len(valores) == 0:
+            return [np.nan] * len(qs)
+        pesos = np.concatenate([np.full(len(n), 2.0 ** i) for i, n in enumerate(self.niveles)])
+        orden = np.argsort(valores)
+        valores, acumulado = valores[orden], np.cumsum(pesos[orden])
+        if len(valores) == acumulado[-1]:
+            # Sin compactaciones: cuantiles exactos (interpolación lineal, como pandas)
+            return [float(np.quantile(valores, q)) for q in qs]
+        return [float(valores[min(np.searchsorted(acumulado, q * acumulado[-1]), len(valores) - 1)]) for q in qs]
+
+
+class HyperLogLog:
+    def __init__(self, p=P_HLL):
+        self.p = p
+        self.registros = np.zeros(1 << p, dtype=np.uint8)
+
+    def agregar(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        resto = (hashes << np.uint64(self.p)) | np.uint64(1 << (self.p - 1))
+        # Ceros a la izquierda exactos: frexp sobre las dos mitades de 32 bits
+        alto = (resto >> np.uint64(32)).astype(np.float64)
+        bajo = (resto & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        ceros = np.where(alto > 0, 32 - np.frexp(alto)[1], 64 - np.frexp(bajo)[1])
+        np.maximum.at(self.registros, idx, (ceros + 1).astype(np.uint8))
+
+    def combinar(self, otro):
+        np.maximum(self.registros, otro.registros, out=self.registros)
+
+    def estimar(self):
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimado = alfa * m * m / np.sum(2.0 ** -self.registros.astype(float))
+        vacios = int(np.sum(self.registros == 0))
+        if estimado <= 2.5 * m and vacios:
+            estimado = m * np.log(m / vacios)
+        return int(round(estimado))
+
+
+class PerfilColumna:
+    def __init__(self, nombre, dtype):
+        self.nombre = nombre
+        self.dtype = str(dtype)
+        self.numerica = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        self.n = 0
+        self.nulos = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self.cuantiles = SketchCuantiles() if self.numerica else None
+        self.distintos = HyperLogLog()
+        self.top = pd.Series(dtype="int64")
+
+    def agregar(self, serie):
+        validos = serie.dropna()
+        self.nulos += len(serie) - len(validos)
+        if self.numerica and len(validos):
+            x = validos.to_numpy(dtype=float)
+            otro = PerfilColumna(self.nombre, serie.dtype)
+            otro.n, otro.media = len(x), float(x.mean())
+            otro.m2 = float(((x - otro.media) ** 2).sum())
+            otro.minimo, otro.maximo = float(x.min()), float(x.max())
+            self._combinar_momentos(otro)
+            self.cuantiles.agregar(x)
+        else:
+            self.n += len(validos)
+        self.distintos.agregar(pd.util.hash_pandas_object(validos, index=False).to_numpy())
+        self._combinar_top(validos.value_counts(sort=False))
+
+    def _combinar_momentos(self, otro):
+        # Fórmula de Chan para combinar media y varianza de dos particiones
+        n = self.n + otro.n
+        if n == 0:
+            return
+        delta = otro.media - self.media
+        self.media += delta * otro.n / n
+        self.m2 += otro.m2 + delta ** 2 * self.n * otro.n / n
+        self.n = n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+
+    def _combinar_top(self, conteos):
+        conteos = conteos[conteos > 0]
+        self.top = self.top.add(conteos, fill_value=0).astype("int64") if len(self.top) else conteos.astype("int64")
+        if len(self.top) > CAPACIDAD_TOP:
+            self.top = self.top.nlargest(CAPACIDAD_TOP)
+
+    def combinar(self, otro):
+        self.nulos += otro.nulos
+        if self.numerica:
+            self._combinar_momentos(otro)
+            self.cuantiles.combinar(otro.cuantiles)
+        else:
+            self.n += otro.n
+        self.distintos.combinar(otro.distintos)
+        self._combinar_top(otro.top)
+
+    @property
+    def desviacion(self):
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else np.nan
+
+    @property
+    def n_distintos(self):
+        # Si todos los valores caben en el top, el conteo es exacto
+        if len(self.top) < CAPACIDAD_TOP:
+            return len(self.top)
+        return self.distintos.estimar()
+
+    def mas_frecuentes(self, k=TOP_K):
+        return self.top.sort_values(ascending=False, kind="stable").head(k)
+
+
+class PerfilDataset:
+    def __init__(self, columnas, dtypes):
+        self.filas = 0
+        self.columnas = {c: PerfilColumna(c, dtypes[c]) for c in columnas}
+
+    def agregar(self, bloque):
+        self.filas += len(bloque)
+        for col, perfil in self.columnas.items():
+            perfil.agregar(bloque[col])
+
+    def combinar(self, otro):
+        self.filas += otro.filas
+        for col, perfil in self.columnas.items():
+            perfil.combinar(otro.columnas[col])
+
+    # --- Vistas para los paneles de la app
+    @property
+    def total_nulos(self):
+        return sum(p.nulos for p in self.columnas.values())
+
+    def info(self):
+        return pd.DataFrame({
+            "Column": list(self.columnas),
+            "Non-Null Count": [self.filas - p.nulos for p in self.columnas.values()],
+            "Null Count": [p.nulos for p in self.columnas.values()],
+            "Dtype": [p.dtype for p in self.columnas.values()],
+        })
+
+    def describe_numericas(self):
+        filas = {}
+        for col, p in self.columnas.items():
+            if not p.numerica:
+                continue
+            q25, q50, q75 = p.cuantiles.cuantiles([0.25, 0.5, 0.75])
+            filas[col] = {
+                "count": float(p.n), "mean": p.media if p.n else np.nan, "std": p.desviacion,
+                "min": p.minimo if p.n else np.nan, "25%": q25, "50%": q50, "75%": q75,
+                "max": p.maximo if p.n else np.nan,
+            }
+        return pd.DataFrame.from_dict(filas, orient="index")
+
+    def describe_categoricas(self, columnas):
+        filas = {}
+        for col in columnas:
+            p = self.columnas[col]
+            top = p.mas_frecuentes(1)
+            filas[col] = {
+                "count": p.n, "unique": p.n_distintos,
+                "top": top.index[0] if len(top) else None,
+                "freq": int(top.iloc[0]) if len(top) else None,
+            }
+        return pd.DataFrame.from_dict(filas, orient="index")
+
+
+def construir_perfil(df, tamano_bloque=TAMANO_BLOQUE):
+    perfil = PerfilDataset(df.columns, df.dtypes)
+    for inicio in range(0, max(len(df), 1), tamano_bloque):
+        perfil.agregar(df.iloc[inicio:inicio + tamano_bloque])
+    return perfil
+
+
+_perfiles = OrderedDict()
+_lock = threading.Lock()
+
+
+def perfil_de(df, version=None):
+    """Perfil del dataset, construido una sola vez por versión (compartido entre sesiones)."""
+    if version is None:
+        return construir_perfil(df)
+    clave = (version, tuple(df.columns))
+    with _lock:
+        if clave in _perfiles:
+            _perfiles.move_to_end(clave)
+            return _perfiles[clave]
+    perfil = construir_perfil(df)
+    with _lock:
+        _perfiles[clave] = perfil
+        while len(_perfiles) > MAX_PERFILES:
+            _perfiles.popitem(last=False)
+    return perfil
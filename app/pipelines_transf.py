@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder, RobustScaler
@@ -7,21 +8,40 @@ from sklearn.impute import SimpleImputer
 from sklearn.base import BaseEstimator, TransformerMixin
 
 
+def _dense(X):
+    return X.toarray() if sp.issparse(X) else np.asarray(X, dtype=np.float64)
+
+
+def _is_null(value):
+    # None, NaN (float o numpy) y pd.NA; `pd.NA != pd.NA` no es un booleano y no sirve como prueba
+    return value is None or value is pd.NA or (isinstance(value, (float, np.floating)) and value != value)
+
+
 num_pipeline = Pipeline([
     ("imputer", SimpleImputer(strategy="median")),
     ("rbst_scaler", RobustScaler()),
 ])
 
 class CustomOneHotEncoder(BaseEstimator, TransformerMixin):
-    def __init__(self):
+    # Valor por defecto a nivel de clase: los pickles anteriores no tienen `sparse`
+    sparse = False
+
+    def __init__(self, sparse=False):
+        self.sparse = sparse
         try:
             self._oh = OneHotEncoder(sparse_output=False, handle_unknown="ignore")
         except TypeError:
             self._oh = OneHotEncoder(sparse=False, handle_unknown="ignore")
         self._columns = []
 
+    def _sync_output(self):
+        # sklearn >= 1.2 usa `sparse_output`; versiones anteriores, `sparse`
+        attr = "sparse_output" if hasattr(self._oh, "sparse_output") else "sparse"
+        setattr(self._oh, attr, bool(self.sparse))
+
     def fit(self, X, y=None):
-        X_cat = X.select_dtypes(include=["object"]).copy()
+        self._sync_output()
+        X_cat = X.select_dtypes(include=["object", "category"])
         if X_cat.shape[1] == 0:
             self._columns = []
             self._oh.fit(pd.DataFrame(index=X.index))
@@ -31,49 +51,292 @@ class CustomOneHotEncoder(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X, y=None):
-        X_cat = X.select_dtypes(include=["object"]).copy()
+        X_cat = X.select_dtypes(include=["object", "category"])
         if X_cat.shape[1] == 0:
-            return pd.DataFrame(index=X.index)
+            return sp.csr_matrix((len(X), 0)) if self.sparse else pd.DataFrame(index=X.index)
         X_cat_oh = self._oh.transform(X_cat)
+        if self.sparse:
+            # CSR directo, sin pasar por un DataFrame denso
+            return sp.csr_matrix(X_cat_oh)
         return pd.DataFrame(X_cat_oh, columns=self._columns, index=X.index)
 
 class DataFramePreparer(BaseEstimator, TransformerMixin):
-    def __init__(self):
+    # Valores por defecto a nivel de clase: los pickles anteriores no tienen `sparse` ni `input_ranges_`
+    sparse = False
+    input_ranges_ = None
+
+    def __init__(self, sparse=False):
+        self.sparse = sparse
         self._full_pipeline = None
         self._columns = None
         self.input_features_ = None
 
     def fit(self, X, y=None):
-        X0 = X.copy()
-        self.input_features_ = list(X0.columns)
+        # Sin copias defensivas: ningún paso modifica X
+        self.input_features_ = list(X.columns)
 
-        num_attribs = list(X0.select_dtypes(exclude=["object"]).columns)
-        cat_attribs = list(X0.select_dtypes(include=["object"]).columns)
+        num_attribs = list(X.select_dtypes(exclude=["object", "category"]).columns)
+        cat_attribs = list(X.select_dtypes(include=["object", "category"]).columns)
+        # Tipo y rango de entrenamiento de cada numérica, para el esquema de entrada del bundle
+        self.input_ranges_ = {
+            col: {
+                "dtype": "int" if pd.api.types.is_integer_dtype(X[col]) else "float",
+                "min": float(X[col].min()),
+                "max": float(X[col].max()),
+                "range_source": "training",
+            }
+            for col in num_attribs
+        }
 
         self._full_pipeline = ColumnTransformer([
             ("num", num_pipeline, num_attribs),
-            ("cat", CustomOneHotEncoder(), cat_attribs),
-        ])
+            ("cat", CustomOneHotEncoder(sparse=self.sparse), cat_attribs),
+        ], sparse_threshold=1.0 if self.sparse else 0.3)
 
-        Xt = self._full_pipeline.fit_transform(X0)
+        Xt = self._full_pipeline.fit_transform(X)
         out_cols = []
         out_cols.extend(num_attribs)
         cat_encoder = self._full_pipeline.named_transformers_["cat"]
         if hasattr(cat_encoder, "_columns") and cat_encoder._columns:
             out_cols.extend(list(cat_encoder._columns))
         self._columns = out_cols
+        if self.sparse:
+            self.set_sparse(True)
+        return self
+
+    def set_sparse(self, sparse=True):
+        # Cambia el formato de salida de un preparador ya ajustado: en modo disperso el bloque
+        # numérico y el one-hot se apilan como CSR sin densificar
+        self.sparse = sparse
+        cat_encoder = self._full_pipeline.named_transformers_["cat"]
+        cat_encoder.sparse = sparse
+        cat_encoder._sync_output()
+        self._full_pipeline.sparse_threshold = 1.0 if sparse else 0.3
+        self._full_pipeline.sparse_output_ = sparse
+        return self
+
+    def transform(self, X, y=None):
+        Xt = self._full_pipeline.transform(X)
+        return sp.csr_matrix(Xt) if self.sparse and not sp.issparse(Xt) else Xt
+
+    def transform_into(self, X, out=None, dtype=np.float64, chunk_rows=None):
+        # Salida densa escrita directamente en un único array preasignado (ver CompiledPreparer)
+        return self.compile().transform_into(X, out, dtype, chunk_rows)
+
+    def input_schema(self):
+        # Esquema de las variables crudas: tipo, mediana y rango (numéricas) y categorías vistas en fit
+        schema = {}
+        ranges = self.input_ranges_ or {}
+        for name, trans, cols in self._full_pipeline.transformers_:
+            if name == "num":
+                medians = trans.named_steps["imputer"].statistics_
+                for col, med in zip(cols, medians):
+                    schema[col] = {"kind": "numeric", "median": float(med), **ranges.get(col, {})}
+            elif name == "cat" and len(cols) > 0:
+                for col, cats in zip(cols, trans._oh.categories_):
+                    schema[col] = {"kind": "categorical", "categories": [str(c) for c in cats]}
+        return {col: schema[col] for col in self.input_features_ if col in schema}
+
+    def compile(self):
+        return CompiledPreparer.from_preparer(self)
+
+
+class CompiledPreparer:
+    # Forma "compilada" de un DataFramePreparer ya ajustado para inferencia fila a fila:
+    # medianas, centro y escala como arrays, y tablas categoría → índice de salida.
+    # Un dict entra directamente en un vector float preasignado, sin pandas.
+
+    def __init__(self, num_cols, medians, center, scale, cat_lookup, n_features, input_features,
+                 num_pos=None, feature_names=None):
+        self.num_cols = list(num_cols)
+        self.medians = np.asarray(medians, dtype=np.float64)
+        self.center = np.asarray(center, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.cat_lookup = cat_lookup
+        self.n_features = n_features
+        self.input_features = list(input_features)
+        self.num_pos = np.arange(len(self.num_cols)) if num_pos is None else np.asarray(num_pos, dtype=np.intp)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    @classmethod
+    def from_preparer(cls, preparer):
+        num_cols, medians, center, scale = [], [], [], []
+        cat_lookup = []
+        offset = 0
+        for name, trans, cols in preparer._full_pipeline.transformers_:
+            if name == "num" and len(cols) > 0:
+                imputer = trans.named_steps["imputer"]
+                scaler = trans.named_steps["rbst_scaler"]
+                num_cols = list(cols)
+                medians = imputer.statistics_
+                center = scaler.center_ if scaler.center_ is not None else np.zeros(len(cols))
+                scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(cols))
+                offset += len(cols)
+            elif name == "cat" and len(cols) > 0:
+                for col, cats in zip(cols, trans._oh.categories_):
+                    lookup, nan_index = {}, None
+                    for j, cat in enumerate(cats):
+                        if isinstance(cat, float) and np.isnan(cat):
+                            nan_index = offset + j
+                        else:
+                            lookup[cat] = offset + j
+                    cat_lookup.append((col, lookup, nan_index))
+                    offset += len(cats)
+        return cls(num_cols, medians, center, scale, cat_lookup, offset, preparer.input_features_,
+                   feature_names=preparer._columns)
+
+    def select(self, features):
+        # Versión podada: solo las columnas crudas y categorías que alimentan `features`, en ese orden
+        pos = {f: i for i, f in enumerate(features)}
+        name = self.feature_names
+        keep = [i for i, col in enumerate(self.num_cols) if name[self.num_pos[i]] in pos]
+        cat_lookup = []
+        for col, lookup, nan_index in self.cat_lookup:
+            sub = {cat: pos[name[idx]] for cat, idx in lookup.items() if name[idx] in pos}
+            sub_nan = pos[name[nan_index]] if nan_index is not None and name[nan_index] in pos else None
+            if sub or sub_nan is not None:
+                cat_lookup.append((col, sub, sub_nan))
+        used = {self.num_cols[i] for i in keep} | {col for col, _, _ in cat_lookup}
+        return CompiledPreparer(
+            [self.num_cols[i] for i in keep], self.medians[keep], self.center[keep], self.scale[keep],
+            cat_lookup, len(features), [c for c in self.input_features if c in used],
+            num_pos=[pos[name[self.num_pos[i]]] for i in keep], feature_names=features,
+        )
+
+    def transform_row(self, row, out=None):
+        if out is None:
+            out = np.zeros(self.n_features, dtype=np.float64)
+        else:
+            out[:] = 0.0
+        buf = np.empty(len(self.num_cols), dtype=np.float64)
+        for i, col in enumerate(self.num_cols):
+            value = row.get(col)
+            buf[i] = self.medians[i] if _is_null(value) else float(value)
+        out[self.num_pos] = (buf - self.center) / self.scale
+        for col, lookup, nan_index in self.cat_lookup:
+            value = row.get(col)
+            if _is_null(value):
+                idx = nan_index
+            else:
+                idx = lookup.get(value)
+            # Categorías desconocidas → todo ceros (handle_unknown="ignore")
+            if idx is not None:
+                out[idx] = 1.0
+        return out
+
+    def transform_records(self, records):
+        out = np.zeros((len(records), self.n_features), dtype=np.float64)
+        for i, row in enumerate(records):
+            self.transform_row(row, out[i])
+        return out
+
+    def transform_frame(self, X, out=None, dtype=np.float64):
+        # Camino vectorizado por columnas para lotes: cada bloque se escribe directamente
+        # en su franja de `out`, sin matrices intermedias ni hstack
+        if out is None:
+            out = np.zeros((len(X), self.n_features), dtype=dtype)
+        else:
+            out[...] = 0
+        for i, col in enumerate(self.num_cols):
+            serie = X[col]
+            if serie.dtype == object:
+                serie = pd.to_numeric(serie, errors="coerce")
+            valores = serie.to_numpy(dtype=np.float64, na_value=np.nan) if pd.api.types.is_extension_array_dtype(serie) \
+                else serie.to_numpy()
+            destino = out[:, self.num_pos[i]]
+            # En float64 se opera en el propio `out`; en float32 se calcula en float64 y se
+            # redondea al escribir, para obtener exactamente el mismo valor que el camino denso
+            v = destino if out.dtype == np.float64 else np.empty(len(valores), dtype=np.float64)
+            np.copyto(v, valores, casting="unsafe")
+            v[np.isnan(v)] = self.medians[i]
+            v -= self.center[i]
+            v /= self.scale[i]
+            if v is not destino:
+                destino[:] = v
+        for col, lookup, nan_index in self.cat_lookup:
+            serie = X[col]
+            if lookup:
+                codes = pd.Categorical(serie, categories=list(lookup)).codes
+                validos = np.flatnonzero(codes >= 0)
+                destino = np.fromiter(lookup.values(), dtype=np.intp, count=len(lookup))
+                out[validos, destino[codes[validos]]] = 1
+            if nan_index is not None:
+                out[serie.isna().to_numpy(), nan_index] = 1
+        return out
+
+    def transform_into(self, X, out=None, dtype=np.float64, chunk_rows=None):
+        # Por bloques de filas: los temporales por columna quedan acotados a `chunk_rows`
+        if out is None:
+            out = np.empty((len(X), self.n_features), dtype=dtype)
+        step = chunk_rows or max(len(X), 1)
+        for start in range(0, len(X), step):
+            self.transform_frame(X.iloc[start:start + step], out=out[start:start + step])
+        return out
+
+    def check_parity(self, preparer, X, atol=1e-9):
+        expected = _dense(preparer.transform(X))
+        got = self.transform_records(X.to_dict(orient="records"))
+        return expected.shape == got.shape and np.allclose(expected, got, atol=atol, equal_nan=True)
+
+    def parity_sample(self):
+        # Filas sintéticas que recorren cada categoría vista en fit, medianas y nulos
+        n = max([len(lookup) for _, lookup, _ in self.cat_lookup] + [1]) + 1
+        data = {}
+        for i, col in enumerate(self.num_cols):
+            values = [self.medians[i] + (j - n // 2) * self.scale[i] for j in range(n)]
+            values[-1] = np.nan
+            data[col] = values
+        for col, lookup, _ in self.cat_lookup:
+            cats = list(lookup) or [None]
+            data[col] = [cats[j % len(cats)] for j in range(n - 1)] + ["__unseen__"]
+        return pd.DataFrame(data)[[c for c in self.input_features if c in data]]
+
+
+class PrunedPreparer(BaseEstimator, TransformerMixin):
+    # Preparador podado para bundles "top": solo calcula las variables crudas y
+    # categorías que alimentan las features seleccionadas, ya en su orden.
+    def __init__(self, compiled=None):
+        self.compiled = compiled
+
+    @classmethod
+    def from_preparer(cls, preparer, features):
+        return cls(CompiledPreparer.from_preparer(preparer).select(list(features)))
+
+    def fit(self, X, y=None):
         return self
 
     def transform(self, X, y=None):
-        X0 = X.copy()
-        return self._full_pipeline.transform(X0)
+        return self.compiled.transform_frame(X)
+
+    def transform_into(self, X, out=None, dtype=np.float64, chunk_rows=None):
+        return self.compiled.transform_into(X, out, dtype, chunk_rows)
+
+    def compile(self):
+        return self.compiled
 
 
 class ColumnFilter(BaseEstimator, TransformerMixin):
+    # Valores por defecto a nivel de clase: los pickles antiguos no tienen estos atributos
+    indices_ = None
+    n_features_in_ = None
+
     def __init__(self, columns=None):
         self.columns = list(columns) if columns is not None else None
 
     def fit(self, X, y=None):
+        if isinstance(X, pd.DataFrame) and self.columns is not None:
+            self.bind(X.columns)
+        return self
+
+    def bind(self, feature_names):
+        # Índices precalculados por nombre para entradas ndarray
+        names = list(feature_names)
+        position = {name: i for i, name in enumerate(names)}
+        missing = [c for c in self.columns if c not in position]
+        if missing:
+            raise ValueError(f"ColumnFilter: columns not found in the input features: {missing}")
+        self.indices_ = np.array([position[c] for c in self.columns], dtype=np.intp)
+        self.n_features_in_ = len(names)
         return self
 
     def transform(self, X):
@@ -84,11 +347,40 @@ class ColumnFilter(BaseEstimator, TransformerMixin):
             keep = [c for c in self.columns if c in X.columns]
             return X[keep]
 
-        elif isinstance(X, np.ndarray):
-            if len(self.columns) > X.shape[1]:
+        elif isinstance(X, np.ndarray) or sp.issparse(X):
+            if self.indices_ is None:
                 raise ValueError(
-                    f"ColumnFilter: expected {len(self.columns)} columns, got {X.shape[1]}."
+                    "ColumnFilter: feature names are unknown for array input; call bind(feature_names) first."
                 )
-            return X[:, :len(self.columns)]
+            if X.shape[1] != self.n_features_in_:
+                raise ValueError(
+                    f"ColumnFilter: expected {self.n_features_in_} columns, got {X.shape[1]}."
+                )
+            return X[:, self.indices_] if isinstance(X, np.ndarray) else sp.csr_matrix(X)[:, self.indices_]
+
+        return X
+
+
+def prepare_for_inference(bundle):
+    """
+    Ajustes de inferencia al cargar un bundle: enlaza el ColumnFilter con los nombres
+    de salida del preparador y, si supera la paridad, añade `inference_pipeline` con
+    el preprocesado podado a las features seleccionadas.
+    """
+    steps = getattr(bundle.get("pipeline"), "steps", None)
+    if not steps or len(steps) < 3:
+        return bundle
+    (pre_name, pre), (_, filt) = steps[0], steps[1]
+    if not (isinstance(pre, DataFramePreparer) and isinstance(filt, ColumnFilter) and filt.columns):
+        return bundle
+    if filt.indices_ is None:
+        filt.bind(pre._columns)
 
-        return X
\ No newline at end of file
+    pruned = PrunedPreparer.from_preparer(pre, filt.columns)
+    sample = CompiledPreparer.from_preparer(pre).parity_sample()
+    expected = _dense(filt.transform(_dense(pre.transform(sample))))
+    if np.allclose(pruned.transform(sample), expected, equal_nan=True) and pruned.compiled.check_parity(
+        pruned, sample[pruned.compiled.input_features]
+    ):
+        bundle["inference_pipeline"] = Pipeline([(pre_name, pruned)] + list(steps[2:]))
+    return bundle
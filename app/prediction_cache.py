@@ -0,0 +1,166 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from app.scoring import (
+    NEGATIVE_LABEL, POSITIVE_LABEL, ScoreResult, bundle_threshold, compiled_preparer, score,
+)
+
+
+# =====================================================
+# CACHÉ DE PREDICCIONES (compartida por todo el proceso)
+# =====================================================
+# LRU acotada de probabilidades indexada por (sha256 del bundle, fila canónica).
+# La fila canónica es la tupla de las variables que usa el preparador, en su
+# orden: numéricas como float y categóricas tal cual, con los nulos como None.
+# La clave es la tupla completa, no su hash(): una colisión de 64 bits serviría
+# en silencio la probabilidad de otro cliente.
+# Formulario, lotes y API comparten la misma clave, así que un cliente ya
+# puntuado por cualquiera de ellos no se vuelve a puntuar. Solo se guarda la
+# probabilidad: la etiqueta sale del umbral actual del bundle.
+
+MAX_ENTRIES = int(os.environ.get("CHURN_PREDICTION_CACHE", 200_000))
+
+
+class PredictionCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, prefix, keys):
+        """Probabilidades en caché (NaN si falta) para cada clave."""
+        out = np.full(len(keys), np.nan)
+        with self._lock:
+            for i, key in enumerate(keys):
+                proba = self._entries.get((prefix, key))
+                if proba is not None:
+                    self._entries.move_to_end((prefix, key))
+                    out[i] = proba
+            found = int(np.count_nonzero(~np.isnan(out)))
+            self.hits += found
+            self.misses += len(keys) - found
+        return out
+
+    def put_many(self, prefix, keys, probas):
+        with self._lock:
+            for key, proba in zip(keys, probas):
+                self._entries[(prefix, key)] = float(proba)
+                self._entries.move_to_end((prefix, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+_CACHE = PredictionCache()
+
+
+def get_cache():
+    return _CACHE
+
+
+def _key_columns(bundle):
+    compiled = compiled_preparer(bundle)
+    if compiled is None:
+        return None
+    return list(compiled.num_cols), [col for col, _, _ in compiled.cat_lookup]
+
+
+def _canonical_value(value, numeric):
+    if value is None or value is pd.NA:
+        return None
+    if numeric:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return value
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def row_keys(bundle, X):
+    """La fila canónica (tupla) de cada fila de X (dict, lista de dicts o DataFrame); None si el bundle no lo permite."""
+    columnas = _key_columns(bundle)
+    if columnas is None:
+        return None
+    num_cols, cat_cols = columnas
+    if isinstance(X, dict):
+        X = [X]
+    if isinstance(X, list):
+        return [
+            tuple(_canonical_value(row.get(c), True) for c in num_cols)
+            + tuple(_canonical_value(row.get(c), False) for c in cat_cols)
+            for row in X
+        ]
+    # DataFrame: canonicalización vectorizada por columna y una tupla por fila
+    partes = []
+    for c in num_cols:
+        v = pd.to_numeric(X[c], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        partes.append(np.where(np.isnan(v), None, v.astype(object)))
+    for c in cat_cols:
+        s = X[c]
+        partes.append(s.astype(object).where(s.notna(), None).to_numpy())
+    return list(zip(*partes))
+
+
+def _subset(X, idx):
+    if isinstance(X, dict):
+        return X
+    if isinstance(X, list):
+        return [X[i] for i in idx]
+    return X.iloc[idx]
+
+
+def score_cached(bundle, X, cache=None, stats=None):
+    """
+    Como scoring.score, pero reutiliza probabilidades ya calculadas y solo puntúa
+    filas nuevas. Si se pasa `stats` (dict), acumula en stats["hits"] las filas servidas desde la caché.
+    """
+    cache = _CACHE if cache is None else cache
+    prefix = bundle.get("sha256")
+    keys = row_keys(bundle, X) if prefix is not None else None
+    if keys is None:
+        return score(bundle, X)
+
+    proba = cache.get_many(prefix, keys)
+    faltan = np.flatnonzero(np.isnan(proba))
+    if stats is not None:
+        stats["hits"] = stats.get("hits", 0) + len(keys) - len(faltan)
+    if len(faltan):
+        # Filas repetidas dentro del mismo lote se puntúan una sola vez
+        primera = {}
+        for i in faltan:
+            primera.setdefault(keys[i], i)
+        unicas = list(primera.values())
+        nuevas = score(bundle, _subset(X, unicas)).proba
+        cache.put_many(prefix, [keys[i] for i in unicas], nuevas)
+        por_clave = dict(zip((keys[i] for i in unicas), nuevas))
+        proba[faltan] = [por_clave[keys[i]] for i in faltan]
+
+    threshold = bundle_threshold(bundle)
+    labels = np.where(proba > threshold, POSITIVE_LABEL, NEGATIVE_LABEL)
+    return ScoreResult(labels, proba, threshold)
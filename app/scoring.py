@@ -0,0 +1,254 @@
+import time
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.special import expit
+
+from app import alloc_profiler
+
+
+# =====================================================
+# SCORING (una sola transformación por llamada)
+# =====================================================
+# pipe.predict + pipe.predict_proba ejecutan el preprocesado dos veces. Aquí el
+# preprocesado (todos los pasos salvo el modelo) se aplica una vez y la etiqueta
+# se deriva de la probabilidad con el umbral del bundle, así que todas las
+# páginas comparten la misma definición de "Yes".
+
+POSITIVE_LABEL = "Yes"
+NEGATIVE_LABEL = "No"
+DEFAULT_THRESHOLD = 0.5
+CHUNK_ROWS = 100_000
+
+
+class ScoreResult:
+    __slots__ = ("labels", "proba", "threshold")
+
+    def __init__(self, labels, proba, threshold):
+        self.labels = labels
+        self.proba = proba
+        self.threshold = threshold
+
+    def __len__(self):
+        return len(self.proba)
+
+    @property
+    def label(self):
+        return self.labels[0]
+
+    @property
+    def probability(self):
+        return float(self.proba[0])
+
+
+def bundle_threshold(bundle):
+    return float(bundle.get("threshold", DEFAULT_THRESHOLD))
+
+
+def inference_pipeline(bundle):
+    # Pipeline podado (ver prepare_for_inference) si existe; si no, el original
+    return bundle.get("inference_pipeline") or bundle["pipeline"]
+
+
+def split_pipeline(pipe):
+    """(preprocesado, modelo final) de un Pipeline de sklearn; sin preprocesado si no es un Pipeline."""
+    if hasattr(pipe, "steps") and len(pipe.steps) > 1:
+        return pipe[:-1], pipe.steps[-1][1]
+    if hasattr(pipe, "steps"):
+        return None, pipe.steps[-1][1]
+    return None, pipe
+
+
+_compiled = weakref.WeakKeyDictionary()
+_compiled_lock = threading.Lock()
+
+
+def compiled_preparer(bundle):
+    """Preparador compilado del primer paso, o None si no se puede compilar o no supera la paridad."""
+    prep, _ = split_pipeline(inference_pipeline(bundle))
+    if prep is None or not hasattr(prep.steps[0][1], "compile"):
+        return None
+    preparer = prep.steps[0][1]
+    with _compiled_lock:
+        if preparer in _compiled:
+            return _compiled[preparer]
+    try:
+        compiled = preparer.compile()
+        # Comprobación de paridad con el camino de sklearn; si falla se usa sklearn
+        if not compiled.check_parity(preparer, compiled.parity_sample()):
+            compiled = None
+    except Exception:
+        compiled = None
+    with _compiled_lock:
+        _compiled[preparer] = compiled
+    return compiled
+
+
+def preferred_dtype(model):
+    # Los árboles de sklearn convierten X a float32 al predecir: entregarlo ya en float32 evita esa copia
+    if type(model).__module__.startswith(("sklearn.tree", "sklearn.ensemble._forest")):
+        return np.float32
+    return np.float64
+
+
+def transform(bundle, X, dtype=None, chunk_rows=CHUNK_ROWS):
+    prep, model = split_pipeline(inference_pipeline(bundle))
+    if prep is None:
+        return X
+    compiled = compiled_preparer(bundle)
+    first = prep.steps[0][1]
+    with alloc_profiler.track("transform"):
+        if compiled is None or getattr(first, "sparse", False):
+            if isinstance(X, (dict, list)):
+                X = pd.DataFrame([X] if isinstance(X, dict) else X)
+            return prep.transform(X)
+        if isinstance(X, list):
+            # Lista de registros (p.ej. un micro-lote del servidor HTTP): directo al array, sin pandas
+            Xt = compiled.transform_records(X)
+        elif isinstance(X, dict) or len(X) == 1:
+            # Una sola fila: el preparador compilado evita pandas
+            row = X if isinstance(X, dict) else X.iloc[0].to_dict()
+            Xt = compiled.transform_row(row)[None, :]
+        else:
+            # Lotes: todos los bloques se escriben en un único array preasignado, sin copias defensivas
+            Xt = compiled.transform_into(X, dtype=dtype or preferred_dtype(model), chunk_rows=chunk_rows)
+        for _, step in prep.steps[1:]:
+            Xt = step.transform(Xt)
+        return Xt
+
+
+# Modelos que aceptan CSR en predict/predict_proba. Se decide por el tipo, no
+# probando: el resto (p.ej. CatBoost) recibe la matriz densa y cualquier error
+# del modelo se propaga tal cual.
+SPARSE_MODULES = (
+    "sklearn.tree", "sklearn.ensemble._forest", "sklearn.ensemble._gb",
+    "sklearn.linear_model", "sklearn.svm", "sklearn.neighbors", "xgboost", "lightgbm",
+)
+
+
+def accepts_sparse(model):
+    return type(model).__module__.startswith(SPARSE_MODULES)
+
+
+def _call(model, method, Xt):
+    if sp.issparse(Xt) and not accepts_sparse(model):
+        Xt = Xt.toarray()
+    return getattr(model, method)(Xt)
+
+
+def positive_proba(model, Xt):
+    if hasattr(model, "predict_proba"):
+        proba = _call(model, "predict_proba", Xt)
+        classes = [str(c) for c in getattr(model, "classes_", [])]
+        col = classes.index(POSITIVE_LABEL) if POSITIVE_LABEL in classes else proba.shape[1] - 1
+        return np.asarray(proba[:, col], dtype=float)
+    # Modelos sin probabilidades: sigmoide fija del margen (0 → 0.5, como predict).
+    # No se normaliza por llamada: la puntuación de una fila no puede depender de
+    # las demás filas del lote, y la caché de predicciones la guarda por fila.
+    scores = np.asarray(_call(model, "decision_function", Xt), dtype=float)
+    classes = [str(c) for c in getattr(model, "classes_", [])]
+    # decision_function > 0 favorece classes_[1]; si "Yes" es classes_[0] se invierte el margen
+    if len(classes) == 2 and classes[0] == POSITIVE_LABEL:
+        scores = -scores
+    return expit(scores)
+
+
+def score_transformed(bundle, Xt):
+    """Puntúa datos ya preprocesados (p.ej. al comparar modelos con el mismo preprocesado)."""
+    _, model = split_pipeline(inference_pipeline(bundle))
+    # Árboles/bosques: motor aplanado (ver tree_engine) si el registro lo adjuntó al bundle
+    engine = bundle.get("tree_engine")
+    if engine is not None and not sp.issparse(Xt) and engine.use_for(Xt.shape[0]):
+        model = engine
+    threshold = bundle_threshold(bundle)
+    with alloc_profiler.track("predict"):
+        proba = positive_proba(model, Xt)
+    # Estricto (>) para coincidir con predict() en el umbral por defecto: argmax desempata hacia "No"
+    labels = np.where(proba > threshold, POSITIVE_LABEL, NEGATIVE_LABEL)
+    return ScoreResult(labels, proba, threshold)
+
+
+def score(bundle, X, dtype=None):
+    """Etiquetas, probabilidades de churn y umbral usado, con una sola pasada de preprocesado."""
+    return score_transformed(bundle, transform(bundle, X, dtype))
+
+
+# =====================================================
+# COMPARACIÓN DE MODELOS
+# =====================================================
+# Los bundles entrenados sobre los mismos datos comparten un preprocesado idéntico
+# (p.ej. todos los *_all): se transforma una vez por huella de preprocesado y los
+# modelos se puntúan en paralelo. CatBoost y los bosques liberan el GIL al predecir,
+# así que el tiempo total se acerca al del modelo más lento y no a la suma.
+
+_fingerprints = weakref.WeakKeyDictionary()
+# Pool persistente: crear hilos en cada llamada cuesta más que puntuar una fila
+COMPARE_WORKERS = 8
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _compare_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=COMPARE_WORKERS, thread_name_prefix="compare")
+        return _pool
+
+
+def preprocessor_fingerprint(bundle):
+    """Hash del preprocesado ajustado (None si el bundle no tiene); igual hash ⇒ misma transformación."""
+    # Clave: el pipeline del bundle (pipe[:-1] crea un objeto nuevo en cada llamada)
+    pipe = inference_pipeline(bundle)
+    with _compiled_lock:
+        if pipe in _fingerprints:
+            return _fingerprints[pipe]
+    prep, _ = split_pipeline(pipe)
+    fingerprint = None if prep is None else joblib.hash(prep)
+    with _compiled_lock:
+        _fingerprints[pipe] = fingerprint
+    return fingerprint
+
+
+def compare_models(bundles, X):
+    """
+    Puntúa X con cada bundle de `bundles` ({nombre: bundle}). Devuelve
+    ({nombre: ScoreResult}, {nombre: tiempos}) con la huella del preprocesado y los
+    tiempos de transformación (compartida por el grupo) y de predicción en ms.
+    """
+    grupos = {}
+    for name, bundle in bundles.items():
+        grupos.setdefault(preprocessor_fingerprint(bundle), []).append(name)
+
+    def transformar(names):
+        first = bundles[names[0]]
+        models = [split_pipeline(inference_pipeline(bundles[n]))[1] for n in names]
+        # float32 solo si todos los modelos del grupo lo prefieren (árboles de sklearn)
+        dtype = np.float32 if all(preferred_dtype(m) == np.float32 for m in models) else np.float64
+        t0 = time.perf_counter()
+        Xt = transform(first, X, dtype=dtype)
+        return Xt, (time.perf_counter() - t0) * 1000
+
+    def puntuar(name, Xt):
+        t0 = time.perf_counter()
+        result = score_transformed(bundles[name], Xt)
+        return result, (time.perf_counter() - t0) * 1000
+
+    pool = _compare_pool()
+    results, timings = {}, {}
+    transformados = {fp: pool.submit(transformar, names) for fp, names in grupos.items()}
+    futuros = {}
+    for fp, names in grupos.items():
+        Xt, t_transform = transformados[fp].result()
+        for name in names:
+            futuros[name] = pool.submit(puntuar, name, Xt)
+            timings[name] = {"preprocessor": fp, "transform_ms": t_transform, "shared_with": len(names) - 1}
+    for name, futuro in futuros.items():
+        results[name], timings[name]["predict_ms"] = futuro.result()
+    return results, timings
@@ -0,0 +1,351 @@
+"""
+Servidor HTTP local de scoring sobre los bundles de `models/` (solo librería estándar).
+
+    python -m app.scoring_server --port 8000 --max-batch 64 --max-wait-ms 5
+
+Endpoints:
+    GET  /health
+    GET  /models
+    GET  /metrics
+    POST /predict/<model>/<version>          {"features": {...}}  (o el dict directamente)
+    POST /predict/<model>/<version>/batch    {"rows": [{...}, ...]}
+"""
+import argparse
+import json
+import threading
+import time
+from collections import deque
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from app.model_metadata import input_schema, validate_input
+from app.model_registry import bundle_path, get_registry, list_bundles
+from app.prediction_cache import get_cache, score_cached
+
+
+# =====================================================
+# MICRO-BATCHING
+# =====================================================
+# Las peticiones individuales concurrentes se agrupan: un hilo por bundle espera
+# la primera fila, recoge más hasta `max_batch` o `max_wait_ms`, y las puntúa
+# con una sola llamada vectorizada a predict_proba.
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+# Espera máxima de un hilo HTTP por su resultado: si el batcher se atasca o muere,
+# la petición responde 503 en lugar de bloquear el hilo para siempre
+REQUEST_TIMEOUT_S = float(os.environ.get("CHURN_REQUEST_TIMEOUT_S", 30))
+BATCH_WORKERS = 4
+LATENCY_WINDOW = 10_000
+
+
+class Metrics:
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.started_at = time.time()
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_rows = 0
+
+    def record_request(self, seconds, rows=1):
+        with self._lock:
+            self.requests += 1
+            self.rows += rows
+            self._latencies.append(seconds)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def record_batch(self, size):
+        with self._lock:
+            self.batches += 1
+            self.batched_rows += size
+
+    def snapshot(self):
+        with self._lock:
+            lat = np.array(self._latencies) * 1000 if self._latencies else np.array([np.nan])
+            uptime = time.time() - self.started_at
+            return {
+                "uptime_s": round(uptime, 1),
+                "requests": self.requests,
+                "rows": self.rows,
+                "errors": self.errors,
+                "throughput_rows_per_s": round(self.rows / uptime, 1) if uptime > 0 else 0.0,
+                "latency_ms_p50": round(float(np.nanpercentile(lat, 50)), 3),
+                "latency_ms_p99": round(float(np.nanpercentile(lat, 99)), 3),
+                "micro_batches": self.batches,
+                "mean_micro_batch": round(self.batched_rows / self.batches, 2) if self.batches else 0.0,
+            }
+
+
+class MicroBatcher:
+    def __init__(self, bundle, metrics, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.bundle = bundle
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                return None
+            self._queue.append((row, future))
+            self._cond.notify()
+        return future
+
+    def close(self):
+        # Se llama al sustituir el bundle: el hilo termina tras vaciar la cola
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _collect(self):
+        with self._cond:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            deadline = time.perf_counter() + self.max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(len(self._queue), self.max_batch)
+            items = [self._queue.popleft() for _ in range(n)]
+        # Las peticiones que ya expiraron (future cancelado) no se puntúan; a partir de
+        # aquí el future está en curso y ya no se puede cancelar
+        return [(row, f) for row, f in items if f.set_running_or_notify_cancel()]
+
+    def _loop(self):
+        while True:
+            items = self._collect()
+            if items is None:
+                return
+            if not items:
+                continue
+            rows = [row for row, _ in items]
+            try:
+                # Clientes ya puntuados (por la API, el formulario o un lote) salen de la caché
+                result = score_cached(self.bundle, rows)
+            except Exception:
+                # Una fila inválida no debe tumbar las peticiones de otros clientes:
+                # se puntúa cada fila por separado y el error solo llega a la suya
+                self._score_one_by_one(items)
+                continue
+            self.metrics.record_batch(len(items))
+            for i, (_, future) in enumerate(items):
+                future.set_result((result.labels[i], float(result.proba[i]), result.threshold))
+
+    def _score_one_by_one(self, items):
+        for row, future in items:
+            try:
+                result = score_cached(self.bundle, [row])
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            self.metrics.record_batch(1)
+            future.set_result((result.label, result.probability, result.threshold))
+
+
+class ScoringService:
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.metrics = Metrics()
+        self._batchers = {}
+        self._lock = threading.Lock()
+        self._batch_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+
+    def _bundle(self, model, version):
+        bundle = get_registry().get(bundle_path(model, version))
+        if bundle is None:
+            raise KeyError(f"Bundle not found: {model}_{version}")
+        return bundle
+
+    def batcher(self, model, version):
+        bundle = self._bundle(model, version)
+        key = (model.lower(), version.lower())
+        with self._lock:
+            batcher = self._batchers.get(key)
+            # Si el registro recargó el bundle (archivo cambiado) se crea un batcher nuevo
+            if batcher is None or batcher.bundle is not bundle:
+                if batcher is not None:
+                    batcher.close()
+                batcher = MicroBatcher(bundle, self.metrics, self.max_batch, self.max_wait_ms)
+                self._batchers[key] = batcher
+            return batcher
+
+    def _validate(self, model, version, rows):
+        # Esquema de entrada del sidecar: errores → 400, avisos (p.ej. fuera de rango) en la respuesta
+        schema = input_schema(model, version)
+        avisos = []
+        for i, row in enumerate(rows):
+            errores, warnings = validate_input(schema, row)
+            prefijo = f"row {i}: " if len(rows) > 1 else ""
+            if errores:
+                raise ValueError(prefijo + "; ".join(errores))
+            avisos.extend(prefijo + w for w in warnings)
+        return avisos
+
+    def predict_one(self, model, version, row):
+        avisos = self._validate(model, version, [row])
+        future = None
+        while future is None:
+            # None: el batcher se cerró entre obtenerlo y encolar; se pide el actual
+            future = self.batcher(model, version).submit(row)
+        try:
+            label, proba, threshold = future.result(timeout=REQUEST_TIMEOUT_S)
+        except FutureTimeout:
+            future.cancel()
+            raise
+        return {"label": str(label), "probability": proba, "threshold": threshold, "warnings": avisos}
+
+    def predict_batch(self, model, version, rows):
+        bundle = self._bundle(model, version)
+        avisos = self._validate(model, version, rows)
+        # Un lote explícito ya es vectorizado: se puntúa de una vez, con el mismo límite de espera
+        future = self._batch_pool.submit(score_cached, bundle, rows)
+        try:
+            result = future.result(timeout=REQUEST_TIMEOUT_S)
+        except FutureTimeout:
+            future.cancel()
+            raise
+        self.metrics.record_batch(len(rows))
+        return {
+            "threshold": result.threshold,
+            "warnings": avisos,
+            "predictions": [
+                {"label": str(label), "probability": float(p)} for label, p in zip(result.labels, result.proba)
+            ],
+        }
+
+
+# =====================================================
+# HTTP
+# =====================================================
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok"})
+            elif self.path == "/models":
+                self._send(200, {"models": [b[:-4] for b in list_bundles()]})
+            elif self.path == "/metrics":
+                self._send(200, {**service.metrics.snapshot(), "prediction_cache": get_cache().stats()})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            t0 = time.perf_counter()
+            parts = [p for p in self.path.split("/") if p]
+            if len(parts) not in (3, 4) or parts[0] != "predict" or (len(parts) == 4 and parts[3] != "batch"):
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError):
+                service.metrics.record_error()
+                self._send(400, {"error": "invalid JSON body"})
+                return
+
+            model, version = parts[1], parts[2]
+            try:
+                if len(parts) == 4:
+                    rows = payload.get("rows") if isinstance(payload, dict) else payload
+                    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+                        raise ValueError("expected {'rows': [ {...}, ... ]}")
+                    response = service.predict_batch(model, version, rows) if rows else {"predictions": []}
+                    n = len(rows)
+                else:
+                    row = payload.get("features", payload) if isinstance(payload, dict) else None
+                    if not isinstance(row, dict):
+                        raise ValueError("expected {'features': {...}}")
+                    response = service.predict_one(model, version, row)
+                    n = 1
+            except KeyError as e:
+                service.metrics.record_error()
+                self._send(404, {"error": str(e.args[0])})
+                return
+            except FutureTimeout:
+                service.metrics.record_error()
+                self._send(503, {"error": f"scoring timed out after {REQUEST_TIMEOUT_S:g} s"})
+                return
+            except Exception as e:
+                service.metrics.record_error()
+                self._send(400, {"error": str(e)})
+                return
+            service.metrics.record_request(time.perf_counter() - t0, n)
+            self._send(200, response)
+
+    return Handler
+
+
+class ScoringHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # La cola de escucha por defecto (5) resetea conexiones con muchos clientes concurrentes
+    request_queue_size = 1024
+
+
+def serve(host="127.0.0.1", port=8000, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    service = ScoringService(max_batch, max_wait_ms)
+    server = ScoringHTTPServer((host, port), make_handler(service))
+    return server, service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local churn scoring server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--preload", nargs="*", default=None,
+                        help="Bundles to load at startup, e.g. boosting_all decisiontree_top (default: all)")
+    args = parser.parse_args()
+
+    # Precarga en el registro compartido para que la primera petición no pague la deserialización
+    for name in args.preload if args.preload is not None else [b[:-4] for b in list_bundles()]:
+        model, version = name.rsplit("_", 1)
+        get_registry().get(bundle_path(model, version))
+
+    server, _ = serve(args.host, args.port, args.max_batch, args.max_wait_ms)
+    print(f"Scoring server on http://{args.host}:{args.port} "
+          f"(max batch {args.max_batch}, max wait {args.max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+# =====================================================
+# SUBMUESTREO DE PUNTOS PARA SCATTERPLOTS
+# =====================================================
+# Rejilla 2D: cada celda conserva una fracción de sus puntos proporcional al
+# presupuesto, con al menos un punto por celda ocupada. Así se mantiene la
+# densidad relativa y los puntos aislados (outliers) no desaparecen.
+
+PRESUPUESTO_PUNTOS = 20_000
+CELDAS_REJILLA = 200
+
+
+def _celda(v, celdas):
+    vmin, vmax = np.nanmin(v), np.nanmax(v)
+    escala = (vmax - vmin) or 1.0
+    return np.clip(((v - vmin) / escala * celdas).astype(np.int64), 0, celdas - 1)
+
+
+def submuestreo_rejilla(x, y, presupuesto=PRESUPUESTO_PUNTOS, celdas=CELDAS_REJILLA, semilla=0):
+    """Índices (ordenados) de los puntos a dibujar; todos si ya caben en el presupuesto."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    validos = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    if len(validos) <= presupuesto:
+        return validos
+
+    xv, yv = x[validos], y[validos]
+    celda = _celda(xv, celdas) * celdas + _celda(yv, celdas)
+
+    # Orden aleatorio dentro de cada celda → rango de cada punto en su celda
+    rng = np.random.default_rng(semilla)
+    orden = np.lexsort((rng.random(len(celda)), celda))
+    celda_ordenada = celda[orden]
+    conteos = np.bincount(celda_ordenada, minlength=celdas * celdas)
+    inicio = np.concatenate(([0], np.cumsum(conteos)[:-1]))
+    rango = np.arange(len(orden)) - inicio[celda_ordenada]
+
+    fraccion = presupuesto / len(validos)
+    cupo = np.maximum(1, np.ceil(conteos * fraccion)).astype(np.int64)
+    elegidos = orden[rango < cupo[celda_ordenada]]
+    return np.sort(validos[elegidos])
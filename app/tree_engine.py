@@ -0,0 +1,197 @@
+import os
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier, ExtraTreeClassifier
+
+
+# =====================================================
+# MOTOR DE ÁRBOLES APLANADOS (opcional)
+# =====================================================
+# Los árboles ajustados se exportan a arrays planos de nodos (feature, threshold,
+# left, right, proba) con todos los árboles concatenados. La predicción avanza
+# todas las filas y todos los árboles un nivel por iteración (max_depth pasos
+# vectorizados), sin el bucle Python por estimador ni la validación de sklearn.
+# Las hojas apuntan a sí mismas con umbral +inf, así que no hace falta máscara.
+# Gana en lotes pequeños de bosques (la sobrecarga de sklearn domina); en lotes
+# grandes el Cython de sklearn es más rápido, así que por encima de `max_rows`
+# se usa el modelo original. El corte es fijo (no se mide al cargar, para que el
+# motor elegido no dependa de la carga de la máquina): por defecto el punto de
+# cruce medido con scripts/bench_tree_engine.py, o CHURN_TREE_ENGINE_MAX_ROWS.
+# Se desactiva con CHURN_TREE_ENGINE=0.
+
+ENABLED = os.environ.get("CHURN_TREE_ENGINE", "1") != "0"
+SUPPORTED = (DecisionTreeClassifier, ExtraTreeClassifier, RandomForestClassifier, ExtraTreesClassifier)
+# Celdas (filas × árboles) por bloque: acota la memoria de los índices de nodo
+CHUNK_CELLS = 1 << 20
+# Lote máximo servido por el motor: un árbol solo gana con muy pocas filas; un bosque, hasta cientos
+DEFAULT_MAX_ROWS = {"tree": 8, "forest": 256}
+MAX_ROWS = os.environ.get("CHURN_TREE_ENGINE_MAX_ROWS")
+# Hasta estos pasos (filas × árboles × profundidad) se recorre en Python puro: con
+# tan pocos nodos la sobrecarga de cada operación de numpy pesa más que el recorrido
+PY_STEPS = 512
+_LEAF = -1
+
+
+class FlatForest:
+    def __init__(self, feature, threshold, left, right, missing_left, proba, roots, max_depth, classes, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.proba = proba
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        # Lote máximo en que se usa el motor en lugar de sklearn (ver default_max_rows)
+        self.max_rows = 0
+        self._lists = None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_estimator(cls, model):
+        trees = model.estimators_ if hasattr(model, "estimators_") else [model]
+        feature, threshold, left, right, missing, proba, roots = [], [], [], [], [], [], []
+        offset, depth = 0, 0
+        for est in trees:
+            t = est.tree_
+            ids = np.arange(t.node_count)
+            leaf = t.children_left == _LEAF
+            roots.append(offset)
+            feature.append(np.where(leaf, 0, t.feature))
+            threshold.append(np.where(leaf, np.inf, t.threshold))
+            left.append(np.where(leaf, ids, t.children_left) + offset)
+            right.append(np.where(leaf, ids, t.children_right) + offset)
+            # sklearn >= 1.3 enruta NaN según missing_go_to_left; antes NaN no era una entrada válida
+            go_left = getattr(t, "missing_go_to_left", None)
+            missing.append(np.zeros(t.node_count, bool) if go_left is None else go_left.astype(bool) | leaf)
+            # predict_proba de un árbol = valores de la hoja normalizados; el bosque promedia los árboles
+            value = t.value[:, 0, :]
+            proba.append(value / np.maximum(value.sum(axis=1, keepdims=True), 1e-300))
+            offset += t.node_count
+            depth = max(depth, t.max_depth)
+        return cls(
+            feature=np.concatenate(feature).astype(np.intp),
+            threshold=np.concatenate(threshold),
+            left=np.concatenate(left).astype(np.intp),
+            right=np.concatenate(right).astype(np.intp),
+            missing_left=np.concatenate(missing),
+            proba=np.concatenate(proba),
+            roots=np.array(roots, dtype=np.intp),
+            max_depth=depth,
+            classes=np.asarray(model.classes_),
+            n_features=model.n_features_in_,
+        )
+
+    def _leaves(self, X):
+        n = X.shape[0]
+        nodes = np.broadcast_to(self.roots, (n, self.n_trees)).copy()
+        # Índice plano fila/feature: X.ravel()[base + feature] en lugar de take_along_axis
+        base = (np.arange(n, dtype=np.intp) * X.shape[1])[:, None]
+        flat = X.ravel()
+        check_missing = self.missing_left.any()
+        for _ in range(self.max_depth):
+            x = flat[base + self.feature[nodes]]
+            nxt = np.where(x <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+            if check_missing:
+                nan = np.isnan(x)
+                if nan.any():
+                    nxt[nan] = np.where(self.missing_left[nodes[nan]], self.left[nodes[nan]], self.right[nodes[nan]])
+            nodes = nxt
+        return nodes
+
+    def _predict_py(self, X):
+        if self._lists is None:
+            self._lists = (
+                self.feature.tolist(), self.threshold.tolist(), self.left.tolist(),
+                self.right.tolist(), self.missing_left.tolist(), self.roots.tolist(),
+            )
+        feature, threshold, left, right, missing_left, roots = self._lists
+        leaves = []
+        for row in X.tolist():
+            for node in roots:
+                while True:
+                    x = row[feature[node]]
+                    nxt = left[node] if x <= threshold[node] or (x != x and missing_left[node]) else right[node]
+                    if nxt == node:
+                        break
+                    node = nxt
+                leaves.append(node)
+        return self.proba[np.array(leaves, dtype=np.intp).reshape(X.shape[0], -1)].mean(axis=1)
+
+    def predict_proba(self, X):
+        # Igual que sklearn: los árboles comparan X en float32 contra umbrales float64
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but the model expects {self.n_features_in_}.")
+        if X.shape[0] * self.n_trees * self.max_depth <= PY_STEPS:
+            return self._predict_py(X)
+        out = np.empty((X.shape[0], self.proba.shape[1]))
+        step = max(CHUNK_CELLS // self.n_trees, 1)
+        for start in range(0, X.shape[0], step):
+            nodes = self._leaves(X[start:start + step])
+            # Una columna por clase: evita materializar (filas, árboles, clases)
+            for k in range(self.proba.shape[1]):
+                out[start:start + step, k] = self.proba[:, k][nodes].mean(axis=1)
+        return out
+
+    def parity_sample(self, n=2_000, seed=0):
+        """Filas sintéticas sobre los umbrales reales (y sus vecinos float32) para cubrir ambas ramas."""
+        rng = np.random.default_rng(seed)
+        X = rng.standard_normal((n, self.n_features_in_)).astype(np.float32)
+        internal = np.isfinite(self.threshold)
+        for f in np.unique(self.feature[internal]):
+            thr = self.threshold[internal & (self.feature == f)].astype(np.float32)
+            candidates = np.concatenate([thr, np.nextafter(thr, np.float32(np.inf)), np.nextafter(thr, np.float32(-np.inf))])
+            X[:, f] = rng.choice(candidates, n)
+        return X
+
+    def check_parity(self, model, X=None, atol=1e-9):
+        X = self.parity_sample() if X is None else X
+        return np.allclose(self.predict_proba(X), model.predict_proba(X), atol=atol)
+
+    def use_for(self, n_rows):
+        return n_rows <= self.max_rows
+
+
+def default_max_rows(model):
+    if MAX_ROWS is not None:
+        return int(MAX_ROWS)
+    return DEFAULT_MAX_ROWS["forest" if hasattr(model, "estimators_") else "tree"]
+
+
+def compile_trees(model, max_rows=None):
+    """FlatForest de un árbol/bosque de sklearn si supera la paridad con predict_proba; None si no."""
+    if not isinstance(model, SUPPORTED) or not hasattr(model, "classes_"):
+        return None
+    try:
+        engine = FlatForest.from_estimator(model)
+        parity = engine.check_parity(model)
+    except (AttributeError, ValueError):
+        # Estructura de árbol distinta a la esperada (otra versión de sklearn): se usa el modelo original
+        return None
+    if not parity:
+        return None
+    engine.max_rows = default_max_rows(model) if max_rows is None else max_rows
+    return engine
+
+
+def attach_tree_engine(bundle):
+    """Añade `tree_engine` al bundle cuando el modelo final es un árbol o bosque compatible."""
+    if not ENABLED:
+        return bundle
+    pipe = bundle.get("inference_pipeline") or bundle.get("pipeline")
+    model = pipe.steps[-1][1] if hasattr(pipe, "steps") else pipe
+    engine = compile_trees(model)
+    if engine is not None and engine.max_rows > 0:
+        bundle["tree_engine"] = engine
+    return bundle
@@ -0,0 +1,109 @@
+import hashlib
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# =====================================================
+# VERSIONES DEL DATASET (copy-on-write + linaje)
+# =====================================================
+# Cada imputación o borrado de columnas crea una versión derivada de su padre.
+# Con copy-on-write activo (ver main.py) las versiones derivadas comparten los
+# buffers de las columnas que no cambian, y como cada versión se direcciona por
+# un hash estable de (padre, operación), repetir la misma cadena en un rerun
+# solo cuesta búsquedas en un diccionario.
+
+MAX_VERSIONES = 16
+
+
+def activar_copy_on_write():
+    # En pandas >= 3 copy-on-write es el comportamiento por defecto
+    try:
+        pd.set_option("mode.copy_on_write", True)
+    except (KeyError, ValueError):
+        pass
+
+
+def hash_dataframe(df):
+    h = hashlib.sha256()
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()[:16]
+
+
+def hash_operacion(hash_padre, operacion):
+    return hashlib.sha256(f"{hash_padre}|{operacion!r}".encode()).hexdigest()[:16]
+
+
+class VersionDataset:
+    __slots__ = ("hash", "df", "padre", "operacion")
+
+    def __init__(self, hash, df, padre=None, operacion=None):
+        self.hash = hash
+        self.df = df
+        self.padre = padre
+        self.operacion = operacion
+
+    def linaje(self):
+        ops = []
+        v = self
+        while v is not None and v.operacion is not None:
+            ops.append(v.operacion)
+            v = v.padre
+        return list(reversed(ops))
+
+
+class AlmacenVersiones:
+    def __init__(self, max_versiones=MAX_VERSIONES):
+        self.max_versiones = max_versiones
+        self._versiones = OrderedDict()
+        self.raiz = None
+
+    def crear_raiz(self, df, hash_contenido=None):
+        version = VersionDataset(hash_contenido or hash_dataframe(df), df)
+        self._versiones.clear()
+        self._versiones[version.hash] = version
+        self.raiz = version
+        return version
+
+    def obtener(self, hash):
+        version = self._versiones.get(hash)
+        if version is not None:
+            self._versiones.move_to_end(hash)
+        return version
+
+    def derivar(self, padre, operacion, funcion):
+        """
+        Devuelve la versión `funcion(padre.df)` identificada por (padre, operación),
+        calculándola solo si no existe todavía.
+        """
+        hash = hash_operacion(padre.hash, operacion)
+        version = self.obtener(hash)
+        if version is None:
+            version = VersionDataset(hash, funcion(padre.df), padre, operacion)
+            self._versiones[hash] = version
+            self._podar()
+        return version
+
+    def _podar(self):
+        # La raíz nunca se descarta; el resto sigue una política LRU
+        while len(self._versiones) > self.max_versiones:
+            hash = next(h for h in self._versiones if self.raiz is None or h != self.raiz.hash)
+            del self._versiones[hash]
+
+    def __len__(self):
+        return len(self._versiones)
+
+
+# =====================================================
+# OPERACIONES DERIVADAS (comparten columnas con el padre)
+# =====================================================
+
+def con_columna(df, col, serie):
+    nuevo = df.copy(deep=False)
+    nuevo[col] = serie
+    return nuevo
+
+
+def sin_columnas(df, columnas):
+    return df.drop(columns=list(columnas), errors="ignore")
@@ -3,6 +3,7 @@ import os
 from app.carga_datos import cargar_archivo, mostrar_info, mostrar_estadisticas, mostrar_preview
 from app.eda import ejecutar_eda
 from app.utils import apply_style
+from app.versiones_dataset import AlmacenVersiones, activar_copy_on_write
 
 # ==============================================
 # CONFIGURACIÓN GLOBAL
@@ -12,6 +13,7 @@ st.set_page_config(
     page_icon="📊",
     layout="wide"
 )
+activar_copy_on_write()
 
 # ==============================================
 # APLICACIÓN PRINCIPAL
@@ -44,8 +46,11 @@ def main():
         if "df_original" not in st.session_state:
             df = cargar_archivo()
             if df is not None:
-                st.session_state.df_original = df.copy()
-                st.session_state.df = df.copy()
+                # Con copy-on-write ambas referencias comparten datos hasta que una versión cambie
+                st.session_state.df_original = df
+                st.session_state.df = df
+                st.session_state.dataset_store = AlmacenVersiones()
+                st.session_state.dataset_version = st.session_state.dataset_store.crear_raiz(df).hash
                 st.sidebar.success("✅ File uploaded successfully!")
 
         if "df_original" in st.session_state:
@@ -53,12 +58,16 @@ def main():
             opciones_submenu = ["Data Preview", "Data Information", "Descriptive Statistics"]
             seleccion_submenu = st.radio("Choose what to view:", opciones_submenu, horizontal=True)
 
+            # Versión raíz (dataset tal como se subió): los perfiles de columnas se cachean contra ella
+            almacen = st.session_state.get("dataset_store")
+            version_original = almacen.raiz.hash if almacen else None
+
             if seleccion_submenu == "Data Preview":
                 mostrar_preview(st.session_state.df_original)
             elif seleccion_submenu == "Data Information":
-                mostrar_info(st.session_state.df_original)
+                mostrar_info(st.session_state.df_original, version_original)
             elif seleccion_submenu == "Descriptive Statistics":
-                mostrar_estadisticas(st.session_state.df_original)
+                mostrar_estadisticas(st.session_state.df_original, version_original)
 
     # ==============================================
     # EDA SECTION
@@ -88,10 +97,10 @@ def main():
                 file_name="cleaned_dataset.csv",
                 mime="text/csv"
             )
-
-            prediction_page(st.session_state.df)
         else:
-            st.warning("⚠️ Perform the EDA first to prepare the dataset.")
+            # El formulario sale del esquema guardado con cada modelo: no hace falta dataset
+            st.info("ℹ️ No session dataset: the form is built from each model's stored input schema.")
+        prediction_page(st.session_state.get("df"))
 
     # ==============================================
     # DASHBOARD
@@ -0,0 +1,94 @@
+"""
+Comparación de memoria y throughput: DataFramePreparer denso vs disperso (CSR)
+sobre un dataset sintético tipo Telco con columnas de alta cardinalidad
+(region, plan_code, device_model).
+
+    python scripts/bench_sparse_onehot.py --rows 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.pipelines_transf import DataFramePreparer
+
+
+def synthetic_dataset(rows, regions, plans, devices, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "tenure": rng.integers(0, 73, rows),
+        "MonthlyCharges": rng.uniform(18, 120, rows).round(2),
+        "Contract": rng.choice(["Month-to-month", "One year", "Two year"], rows),
+        "InternetService": rng.choice(["DSL", "Fiber optic", "No"], rows),
+        "PaymentMethod": rng.choice(["Electronic check", "Mailed check", "Bank transfer", "Credit card"], rows),
+        # Alta cardinalidad con distribución sesgada (Zipf), como en datos reales
+        "region": [f"R{i}" for i in np.minimum(rng.zipf(1.3, rows), regions)],
+        "plan_code": [f"P{i}" for i in rng.integers(0, plans, rows)],
+        "device_model": [f"D{i}" for i in np.minimum(rng.zipf(1.1, rows), devices)],
+    })
+    df["TotalCharges"] = (df["tenure"] * df["MonthlyCharges"]).round(2)
+    logit = -1.5 + 1.2 * (df["Contract"] == "Month-to-month") - 0.03 * df["tenure"] + 0.01 * df["MonthlyCharges"]
+    y = np.where(rng.random(rows) < 1 / (1 + np.exp(-logit)), "Yes", "No")
+    return df, y
+
+
+def nbytes(X):
+    if sp.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+def timed(fn, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--regions", type=int, default=50)
+    parser.add_argument("--plans", type=int, default=300)
+    parser.add_argument("--devices", type=int, default=1_500)
+    args = parser.parse_args()
+
+    df, y = synthetic_dataset(args.rows, args.regions, args.plans, args.devices)
+    resultados = []
+    for modo, sparse in (("dense", False), ("sparse (CSR)", True)):
+        prep = DataFramePreparer(sparse=sparse).fit(df)
+        Xt, t_transform = timed(lambda: prep.transform(df))
+        fila = {
+            "mode": modo,
+            "features": Xt.shape[1],
+            "matrix_MB": nbytes(Xt) / 2**20,
+            "transform_rows_per_s": len(df) / t_transform,
+        }
+        for nombre, modelo in (
+            ("logreg", LogisticRegression(max_iter=200, solver="liblinear")),
+            ("tree", DecisionTreeClassifier(max_depth=8, random_state=0)),
+        ):
+            _, t_fit = timed(lambda: modelo.fit(Xt, y), repeat=1)
+            _, t_pred = timed(lambda: modelo.predict_proba(Xt))
+            fila[f"{nombre}_fit_s"] = t_fit
+            fila[f"{nombre}_predict_rows_per_s"] = len(df) / t_pred
+        resultados.append(fila)
+
+    tabla = pd.DataFrame(resultados).set_index("mode").T
+    with pd.option_context("display.float_format", "{:,.2f}".format):
+        print(f"{args.rows:,} rows · cardinalities region={args.regions}, "
+              f"plan_code={args.plans}, device_model={args.devices}\n")
+        print(tabla)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Motor de árboles aplanados (app/tree_engine.py) vs predict_proba de sklearn por
+tamaño de lote, sobre el bundle decisiontree_all y un RandomForest entrenado
+con las mismas features preprocesadas. Imprime el punto de cruce medido, el
+valor a usar en CHURN_TREE_ENGINE_MAX_ROWS (o en DEFAULT_MAX_ROWS) para esta máquina.
+
+    python scripts/bench_tree_engine.py --max-rows 1000000 --trees 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.model_registry import load_bundle
+from app.scoring import inference_pipeline, split_pipeline, transform
+from app.tree_engine import FlatForest, default_max_rows
+
+DATASET = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "cleaned_dataset.csv"))
+
+
+def timed(fn, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def crossover(engine, model, sizes=(1, 8, 64, 512, 4096), repeat=3):
+    """Mayor tamaño de lote en que el motor supera a model.predict_proba."""
+    X = engine.parity_sample(max(sizes))
+    max_rows = 0
+    for n in sizes:
+        if timed(lambda: engine.predict_proba(X[:n]), repeat) >= timed(lambda: model.predict_proba(X[:n]), repeat):
+            break
+        max_rows = n
+    return max_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-rows", type=int, default=1_000_000)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=12)
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATASET)
+    bundle = load_bundle("decisiontree", "all")
+    Xt = transform(bundle, df[[c for c in bundle["raw_features"] if c != bundle.get("target_name", "Churn")]])
+    _, tree = split_pipeline(inference_pipeline(bundle))
+    forest = RandomForestClassifier(args.trees, max_depth=args.depth, random_state=0).fit(Xt, df["Churn"])
+
+    sizes = [n for n in (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000) if n <= args.max_rows]
+    # Lotes grandes: filas reales repetidas, en float32 como las recibe el árbol
+    X = np.resize(np.asarray(Xt, dtype=np.float32), (max(sizes), Xt.shape[1]))
+
+    resultados = []
+    for nombre, modelo in (("decisiontree_all", tree), (f"random_forest_{args.trees}", forest)):
+        engine = FlatForest.from_estimator(modelo)
+        assert engine.check_parity(modelo) and np.allclose(engine.predict_proba(X[:5_000]), modelo.predict_proba(X[:5_000]))
+        engine.max_rows = default_max_rows(modelo)
+        print(f"{nombre}: measured crossover {crossover(engine, modelo)} rows, configured max_rows {engine.max_rows}")
+        for n in sizes:
+            repeat = 50 if n <= 1_000 else 3 if n <= 100_000 else 1
+            t_sk = timed(lambda: modelo.predict_proba(X[:n]), repeat)
+            t_flat = timed(lambda: engine.predict_proba(X[:n]), repeat)
+            resultados.append({
+                "model": nombre,
+                "rows": n,
+                "sklearn_ms": t_sk * 1000,
+                "flat_ms": t_flat * 1000,
+                "speedup": t_sk / t_flat,
+                "scoring_uses": "flat" if engine.use_for(n) else "sklearn",
+            })
+
+    with pd.option_context("display.float_format", "{:,.3f}".format, "display.width", 120):
+        print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
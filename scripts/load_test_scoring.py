@@ -0,0 +1,76 @@
+"""
+Generador de carga para app/scoring_server.py: N clientes concurrentes envían
+filas de cleaned_dataset.csv al endpoint individual (o por lotes) y se reportan
+latencias p50/p99 del cliente, throughput y las métricas del servidor.
+
+    python -m app.scoring_server --port 8000 &
+    python scripts/load_test_scoring.py --model boosting --version all --requests 2000 --concurrency 32
+"""
+import argparse
+import json
+import os
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+DATASET = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "cleaned_dataset.csv"))
+
+
+def load_rows(path, n, seed=0):
+    df = pd.read_csv(path).drop(columns=["Churn"], errors="ignore")
+    df = df.sample(n=min(n, len(df)), random_state=seed)
+    # JSON no admite NaN: los faltantes viajan como null
+    return json.loads(df.to_json(orient="records"))
+
+
+def post(url, payload):
+    req = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+    )
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(req) as resp:
+        resp.read()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--model", default="boosting")
+    parser.add_argument("--version", default="all")
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=0, help="Rows per request on the /batch endpoint (0 = single)")
+    parser.add_argument("--dataset", default=DATASET)
+    args = parser.parse_args()
+
+    rows = load_rows(args.dataset, max(args.requests, 1))
+    base = f"{args.url}/predict/{args.model}/{args.version}"
+    if args.batch:
+        url = base + "/batch"
+        payloads = [{"rows": [rows[(i * args.batch + j) % len(rows)] for j in range(args.batch)]}
+                    for i in range(args.requests)]
+    else:
+        url = base
+        payloads = [{"features": rows[i % len(rows)]} for i in range(args.requests)]
+
+    post(url, payloads[0])  # calentamiento: carga del bundle y compilación del preparador
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = np.array(list(pool.map(lambda p: post(url, p), payloads))) * 1000
+    elapsed = time.perf_counter() - t0
+    n_rows = args.requests * (args.batch or 1)
+
+    print(f"{args.requests:,} requests · {n_rows:,} rows · concurrency {args.concurrency}")
+    print(f"client latency  p50 {np.percentile(latencies, 50):.2f} ms · "
+          f"p99 {np.percentile(latencies, 99):.2f} ms · max {latencies.max():.2f} ms")
+    print(f"throughput      {args.requests / elapsed:,.0f} req/s · {n_rows / elapsed:,.0f} rows/s")
+    with urllib.request.urlopen(f"{args.url}/metrics") as resp:
+        print("server metrics ", json.dumps(json.loads(resp.read()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
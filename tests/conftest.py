@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from app.model_registry import list_bundles, load_bundle  # noqa: E402
+
+DATASET = os.path.join(ROOT, "cleaned_dataset.csv")
+BUNDLES = [name[:-4] for name in list_bundles()]
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    return pd.read_csv(DATASET)
+
+
+@pytest.fixture(scope="session", params=BUNDLES)
+def bundle(request):
+    model, version = request.param.rsplit("_", 1)
+    return load_bundle(model, version)
+
+
+def features(bundle, df):
+    return df[[c for c in bundle["raw_features"] if c != bundle.get("target_name", "Churn")]]
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from app.pipelines_transf import _dense
+from app.scoring import compiled_preparer, transform
+from conftest import features
+
+
+def _with_edge_rows(X):
+    # Nulos en todas las columnas y categorías nunca vistas en fit
+    nulos = pd.DataFrame([{c: np.nan for c in X.columns}] * 2, columns=X.columns)
+    nuevas = X.head(3).copy()
+    for c in X.select_dtypes(include="object").columns:
+        nuevas[c] = "__unseen__"
+    return pd.concat([X, nulos, nuevas], ignore_index=True)
+
+
+def test_compiled_matches_sklearn(bundle, dataset):
+    X = _with_edge_rows(features(bundle, dataset))
+    expected = _dense(bundle["pipeline"][:-1].transform(X))
+
+    compiled = compiled_preparer(bundle)
+    assert compiled is not None
+    # Lotes (transform_into) y registros fila a fila (transform_records / transform_row)
+    np.testing.assert_allclose(transform(bundle, X, dtype=np.float64), expected, atol=1e-9)
+    records = X.to_dict(orient="records")
+    np.testing.assert_allclose(compiled.transform_records(records), expected, atol=1e-9)
+    np.testing.assert_allclose(transform(bundle, records[-1]), expected[-1:], atol=1e-9)
+
+
+def test_transform_row_accepts_pd_na(bundle, dataset):
+    compiled = compiled_preparer(bundle)
+    row = features(bundle, dataset).iloc[0].to_dict()
+    con_none = {c: None for c in row}
+    con_na = {c: pd.NA for c in row}
+    np.testing.assert_array_equal(compiled.transform_row(con_na), compiled.transform_row(con_none))
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from app.scoring import inference_pipeline, split_pipeline, transform
+from app.tree_engine import FlatForest, compile_trees
+from conftest import features
+
+
+@pytest.fixture
+def tree_model(bundle):
+    _, model = split_pipeline(inference_pipeline(bundle))
+    if compile_trees(model) is None:
+        pytest.skip("final model is not a supported tree/forest")
+    return model
+
+
+def test_flat_forest_matches_sklearn(bundle, tree_model, dataset):
+    engine = FlatForest.from_estimator(tree_model)
+    Xt = np.asarray(transform(bundle, features(bundle, dataset)), dtype=np.float32)
+    # Lote completo (camino numpy), filas sueltas (camino Python) y umbrales exactos
+    np.testing.assert_allclose(engine.predict_proba(Xt), tree_model.predict_proba(Xt), atol=1e-12)
+    for row in Xt[:50]:
+        np.testing.assert_allclose(engine.predict_proba(row[None, :]), tree_model.predict_proba(row[None, :]), atol=1e-12)
+    sample = engine.parity_sample()
+    np.testing.assert_allclose(engine.predict_proba(sample), tree_model.predict_proba(sample), atol=1e-12)
+
+
+def test_engine_cutoff_is_deterministic(tree_model):
+    assert compile_trees(tree_model).max_rows == compile_trees(tree_model).max_rows
+    assert compile_trees(tree_model, max_rows=0).use_for(1) is False